@@ -0,0 +1,174 @@
+"""
+Speed and accuracy benchmark of :mod:`otters.wrangle.psychrometrics` and its array version.
+
+Times the scalar and bulk paths of the main functions on a realistic trend (5-minute samples of a
+year of weather, by default), reports rows/second and peak memory, and checks that every fast path
+stays within tolerance of the scalar reference implementation, at the scalar rows of its output for
+the whole trend.
+
+Usage:
+    python benchmarks/bench_psychrometrics.py [--rows 105120] [--scalar-rows 2000] [--units SI]
+
+Exits with status 1 if any fast path drifts from the reference beyond its tolerance.
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from otters.wrangle import psychrometrics as psy
+from otters.wrangle import psychrometrics_vec as psyv
+
+
+def trend(rows, units, seed=0):
+    """
+    Synthetic weather trend: seasonal and daily cycles of temperature and humidity, plus sensor noise.
+
+    """
+    rng = np.random.default_rng(seed)
+    day = np.arange(rows) / 288
+    tdb = 10 + 12 * np.sin(2 * np.pi * (day - 110) / 365) + 5 * np.sin(2 * np.pi * day) + rng.normal(0, 0.05, rows)
+    rh = np.clip(0.65 - 0.2 * np.sin(2 * np.pi * day) + rng.normal(0, 0.01, rows), 0.05, 1)
+    pressure = np.full(rows, 101325.)
+    if units == psy.IP:
+        tdb, pressure = tdb * 9 / 5 + 32, pressure / 6894.757
+    hum_ratio = psyv.GetHumRatioFromRelHum(tdb, rh, pressure)
+    vap_pres = psyv.GetVapPresFromHumRatio(hum_ratio, pressure)
+    return {'TDryBulb': tdb, 'RelHum': rh, 'Pressure': pressure, 'HumRatio': hum_ratio, 'VapPres': vap_pres,
+            'TDewPoint': psyv.GetTDewPointFromVapPres(tdb, vap_pres),
+            'TWetBulb': psyv.GetTWetBulbFromHumRatio(tdb, hum_ratio, pressure)}
+
+
+def measure(func):
+    """
+    Run func once and return its result, the elapsed seconds and the peak traced memory in MB.
+
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def cases(data):
+    """
+    Benchmark cases: name, argument names, scalar reference, fast paths as (label, function, tolerance).
+
+    """
+    tol = psy.PSYCHROLIB_TOLERANCE
+
+    def table(func):
+        def run(*args):
+            psyv.SetSatVapPresMode('table')
+            try:
+                return func(*args)
+            finally:
+                psyv.SetSatVapPresMode('exact')
+        return run
+
+    def warm(func):
+        # Warm start whatever the number of rows, to time and check it against the cold solvers
+        def run(*args):
+            minimum, psyv.WARM_START_MIN_SIZE = psyv.WARM_START_MIN_SIZE, 0
+            try:
+                return func(*args, time_series=True)
+            finally:
+                psyv.WARM_START_MIN_SIZE = minimum
+        return run
+
+    return [
+        ('GetSatVapPres', ['TDryBulb'], psy.GetSatVapPres, [
+            ('bulk', psyv.GetSatVapPres, 1e-12),
+            ('bulk table', table(psyv.GetSatVapPres), psyv.SAT_VAP_PRES_TABLE_MAX_REL_ERROR),
+        ]),
+        ('GetTDewPointFromVapPres', ['TDryBulb', 'VapPres'], psy.GetTDewPointFromVapPres, [
+            ('bulk', psyv.GetTDewPointFromVapPres, tol),
+            ('bulk time series', warm(psyv.GetTDewPointFromVapPres), tol),
+        ]),
+        ('GetTWetBulbFromHumRatio', ['TDryBulb', 'HumRatio', 'Pressure'], psy.GetTWetBulbFromHumRatio, [
+            ('bulk', psyv.GetTWetBulbFromHumRatio, tol),
+            ('bulk illinois', lambda *a: psyv.GetTWetBulbFromHumRatio(*a, method='illinois'), tol),
+            ('bulk time series', warm(lambda *a, **kw: psyv.GetTWetBulbFromHumRatio(*a, method='illinois', **kw)),
+             tol),
+        ]),
+        ('CalcPsychrometricsFromRelHum', ['TDryBulb', 'RelHum', 'Pressure'], psy.CalcPsychrometricsFromRelHum, [
+            ('bulk', psyv.CalcPsychrometricsFromRelHum, tol),
+            ('bulk table', table(psyv.CalcPsychrometricsFromRelHum), tol),
+            ('chunked', lambda *a: psyv.CalcInChunks(psyv.CalcPsychrometricsFromRelHum, *a, chunk_size=50_000), tol),
+        ]),
+        ('CalcPsychrometricsFromTWetBulb', ['TDryBulb', 'TWetBulb', 'Pressure'], psy.CalcPsychrometricsFromTWetBulb, [
+            ('bulk', psyv.CalcPsychrometricsFromTWetBulb, tol),
+        ]),
+        ('CalcPsychrometricsFromTDewPoint', ['TDryBulb', 'TDewPoint', 'Pressure'],
+         psy.CalcPsychrometricsFromTDewPoint, [
+            ('bulk', psyv.CalcPsychrometricsFromTDewPoint, tol),
+        ]),
+    ]
+
+
+def drift(result, reference, tolerance, relative):
+    """
+    Largest difference between a fast path and the reference, and whether it is within tolerance.
+
+    """
+    result = np.column_stack(result if isinstance(result, tuple) else (result,))
+    reference = np.column_stack(reference if isinstance(reference, tuple) else (reference,))
+    error = np.abs(result - reference)
+    if relative:
+        error = error / np.abs(reference)
+    worst = np.nanmax(error)
+    return worst, bool(worst <= tolerance)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=288 * 365, help='rows of the bulk trend')
+    parser.add_argument('--scalar-rows', type=int, default=2000, help='rows timed and checked with the scalar functions')
+    parser.add_argument('--units', choices=['SI', 'IP'], default='SI')
+    options = parser.parse_args(argv)
+
+    units = psy.SI if options.units == 'SI' else psy.IP
+    psy.SetUnitSystem(units)
+    data = trend(options.rows, units)
+    freezing = psy.FREEZING_POINT_WATER_IP if units == psy.IP else psy.FREEZING_POINT_WATER_SI
+    # Scalar rows spread over the whole trend. The wet-bulb equations have two roots within about half a
+    # degree of freezing, where solvers may legitimately disagree, so those rows are left out.
+    sample = np.linspace(0, options.rows - 1, options.scalar_rows).astype(int)
+    sample = sample[np.abs(data['TWetBulb'][sample] - freezing) > 1]
+
+    print(f"{'function':<32}{'path':<18}{'rows/s':>14}{'peak MB':>10}{'max error':>12}")
+    failures = []
+    for name, arg_names, scalar, fast_paths in cases(data):
+        args = [data[arg] for arg in arg_names]
+        sample_args = [arg[sample] for arg in args]
+
+        reference, elapsed, peak = measure(lambda: [scalar(*row) for row in zip(*sample_args)])
+        reference = tuple(np.array(column) for column in zip(*reference)) if isinstance(reference[0], tuple) \
+            else np.array(reference)
+        print(f"{name:<32}{'scalar':<18}{len(sample) / elapsed:>14,.0f}{peak:>10.1f}{'':>12}")
+
+        for label, func, tolerance in fast_paths:
+            # Checked on the output for the whole trend, so that paths only taken on long inputs (warm start,
+            # several chunks) are checked too
+            result, elapsed, peak = measure(lambda: func(*args))
+            result = tuple(column[sample] for column in result) if isinstance(result, tuple) else result[sample]
+            worst, ok = drift(result, reference, tolerance, relative=name == 'GetSatVapPres')
+            print(f"{'':<32}{label:<18}{options.rows / elapsed:>14,.0f}{peak:>10.1f}{worst:>12.2e}"
+                  f"{'' if ok else '  DRIFT'}")
+            if not ok:
+                failures.append(f'{name} ({label})')
+
+    if failures:
+        print('Fast paths drifting from the reference: ' + ', '.join(failures))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
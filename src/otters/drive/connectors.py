@@ -15,7 +15,7 @@ import pandas as pd
 import numpy as np
 from bs4 import BeautifulSoup
 
-from otters.wrangle.time_tools import str2dt
+from otters.wrangle.time_tools import str2dt, multiResample
 
 class JoolConnector:
     def __init__(self, USER=None, PASSWORD=None, root_url="", tenant_url="", token_url="", auth_url="", config=None):
@@ -172,7 +172,7 @@ class JoolConnector:
         # return df
         df['METER.REFERENCE'] = data['selection'][0]
 
-        df = str2dt(df, timeCol="RAWDATA.LOCAL_TIME_STAMP")
+        str2dt(df, timeCol="RAWDATA.LOCAL_TIME_STAMP", inplace=True, source="jool")
         # Jool holds time data in the database as UTC and changes "local" time on affichage. So even though this column says its local the actual data is UTC
         # Bref: You need to adjust the timezone to the relevant timezone
         df.index = df.index.tz_convert(config["timezone"])
@@ -228,15 +228,7 @@ class JoolConnector:
         return connections
     
     def resample_jool_data(df, period="15min"):
-        max_cols = [col for col in df.columns if "ETAT" in col]
-        mean_cols = [col for col in df.columns if col not in max_cols]
-
-        df_max = df.loc[:, max_cols].resample(period).max()
-        df_mean = df.loc[:, mean_cols].resample(period).mean()
-
-        df = pd.concat([df_max, df_mean], axis=1)
-
-        return df
+        return multiResample(df, period, {"ETAT": "max"}, default="mean")
     
     def get_reference_data(self, reference, start_date=None, end_date=None, config=None):
 
@@ -12,6 +12,7 @@ import openpyxl
 import locale
 
 from ..vis.graph import Graph
+from ..wrangle.time_tools import timeWindow
 
 class LinearRegression(LinearRegression):
     """
@@ -129,14 +130,8 @@ class Regression(Model):
     def regress(self):
 
         if self.start and self.end:
-            self.x = self.x.loc[(self.x.index >= self.start) & (self.x.index <= self.end), :]
-        else:
-            self.x = self.x
-
-        if self.start and self.end:
-            self.y = self.y.loc[(self.y.index >= self.start) & (self.y.index <= self.end), :]
-        else:
-            self.y = self.y
+            self.x = timeWindow(self.x, self.start, self.end)
+            self.y = timeWindow(self.y, self.start, self.end)
         self.reg = LinearRegression(fit_intercept=self.fit_intercept).fit(self.x, self.y)
         return
     
@@ -4,6 +4,9 @@ from datetime import timedelta
 import gc
 import re 
 
+from ..wrangle import psychrometrics as psy
+from ..wrangle import psychrometrics_vec as psyv
+
 class VirtualMeter:
     def __init__(self, df):
         self.df = df
@@ -85,18 +88,186 @@ class VirtualMeter:
 
         return entities
     
-    def createAHU(self, df, name=''):
-        ahu = AHU(self, df, name)
+    def createAHU(self, df, name='', columns=None):
+        ahu = AHU(self, df, name, columns)
         self.AHUs.update({name:ahu})
 
         return
 
+    def auditAHUs(self, **kwargs):
+        """
+        Computes the coil loads of every AHU (see `AHU.computeLoads`) and sums them into energies.  
+
+        **Parameters:**  
+        >**kwargs:** *optional*  
+        >>Passed to `AHU.computeLoads`, eg. `pressure` or `units`
+
+        **Returns:**  
+        >**DataFrame** with one row per AHU and the sensible, latent and total coil energies and the economizer
+        potential, in kWh [SI] or kBtu [IP]
+        """
+        audit = {name: ahu.energy(ahu.computeLoads(**kwargs)) for name, ahu in self.AHUs.items()}
+        return pd.DataFrame(audit).T
+
 class AHU():
     """
-    Urmom
+    An air handling unit of a VirtualMeter: its trends and what can be computed from them.  
+
+    The trends are found in `df` by name (see `COLUMN_PATTERNS`), or given explicitly through `columns`,
+    which maps 'oat', 'rat', 'mat', 'sat', 'rh' (outdoor relative humidity) and 'airflow' to a column name of `df`
+    or to a Series (eg. the site weather when the AHU has no outdoor sensors of its own).  
+    'rh_ra' and 'rh_sa' (return and supply relative humidity) are optional. Only outdoor (or OA) humidity trends
+    are taken for 'rh', so a zone RH must be passed through `columns` to be used.
+
+    Units follow `psychrometrics`: °C, Pa and m³/s [SI] or °F, psi and CFM [IP]. RH can be in % or in [0, 1].
     """
-    def __init__(self, parent, df, name):
+    COLUMN_PATTERNS = {
+        'oat': r'\bOAT\b|outside air temp|outdoor air temp',
+        'rat': r'\bRAT\b|return air temp',
+        'mat': r'\bMAT\b|mixed air temp',
+        'sat': r'\bSAT\b|supply air temp|discharge air temp',
+        'rh': r'\bOA[ _-]?(?:RH|humidity)\b|\b(?:outside|outdoor)\b.*\b(?:RH|humidity)\b',
+        'airflow': r'\bCFM\b|airflow|air flow',
+        'rh_ra': r'return air (?:rh|humidity)|\bRARH\b',
+        'rh_sa': r'supply air (?:rh|humidity)|\bSARH\b',
+    }
+    REQUIRED = ('oat', 'rat', 'mat', 'sat', 'rh', 'airflow')
+
+    def __init__(self, parent, df, name, columns=None):
         self.parent = parent
         self.df = df
         self.name = name
-        return
\ No newline at end of file
+        self.columns = columns if columns is not None else {}
+        self.loads = None
+        return
+
+    def findColumns(self):
+        """
+        Resolves the trends of the AHU: the explicit `columns` first, then the first column of `df` matching each
+        of `COLUMN_PATTERNS` (case insensitive).  
+
+        **Returns:**  
+        >**dict** of Series keyed like `COLUMN_PATTERNS`, without the optional trends that weren't found
+        """
+        trends = {}
+        for key, pattern in self.COLUMN_PATTERNS.items():
+            column = self.columns.get(key)
+            if column is None:
+                column = next((col for col in self.df.columns if re.search(pattern, str(col), re.IGNORECASE)), None)
+            if column is None:
+                continue
+            trends[key] = column if isinstance(column, pd.Series) else self.df[column]
+
+        missing = [key for key in self.REQUIRED if key not in trends]
+        if missing:
+            raise ValueError(f"No column was found for {', '.join(missing)} in AHU {self.name}. Pass them through `columns`")
+        return trends
+
+    def computeLoads(self, pressure=None, units=None):
+        """
+        Computes the coil loads and the economizer free-cooling potential of the AHU, for every timestamp at once.  
+
+        The outdoor air fraction comes from the mixing temperatures. The coil takes the mixed air down (or up) to the
+        supply temperature; without a supply RH, the supply humidity ratio is the mixed one, capped at saturation
+        (condensation). Without a return RH, the return air is assumed to hold the outdoor moisture.  
+        The economizer potential is the cooling that 100% outdoor air would have provided on top of the current mix
+        whenever the outdoor enthalpy is below the return enthalpy.  
+        Out-of-range readings give NaN rows rather than errors.
+
+        **Parameters:**  
+        >**pressure:** *float or Series, default:* `None`  
+        >>Atmospheric pressure. Defaults to the standard sea-level pressure
+
+        >**units:** *psychrometrics.SI or psychrometrics.IP, default:* `None`  
+        >>Unit system of the trends. Defaults to the one set in `psychrometrics`
+
+        **Returns:**  
+        >**DataFrame**, also kept as `self.loads`, with the outdoor air fraction, humidity ratios, enthalpies, dry air
+        mass flow, sensible, latent and total coil loads and economizer potential. Loads are in W [SI] or Btu/h [IP],
+        positive for cooling
+        """
+        if units is None:
+            units = psy.GetUnitSystem()
+        trends = self.findColumns()
+        index = self.df.index
+        values = {key: trend.reindex(index).to_numpy(dtype=float) for key, trend in trends.items()}
+
+        with psyv.UnitSystemContext(units):
+            ip = units == psy.IP
+            if pressure is None:
+                pressure = 14.696 if ip else 101325.
+            P = pressure.reindex(index).to_numpy(dtype=float) if isinstance(pressure, pd.Series) else pressure
+
+            def fraction(rh):
+                return rh / 100 if np.nanmax(rh, initial=0) > 1.5 else rh
+
+            OAT, RAT, MAT, SAT = values['oat'], values['rat'], values['mat'], values['sat']
+            with np.errstate(divide='ignore', invalid='ignore'):
+                OAFraction = np.clip((MAT - RAT) / (OAT - RAT), 0, 1)
+            # The mix can't be told apart when outdoor and return air are at the same temperature,
+            # take the mixed air as outdoor air then
+            OAFraction[np.abs(OAT - RAT) < (0.18 if ip else 0.1)] = 1.
+
+            W_OA = psyv.GetHumRatioFromRelHum(OAT, fraction(values['rh']), P, errors='nan')
+            if 'rh_ra' in values:
+                W_RA = psyv.GetHumRatioFromRelHum(RAT, fraction(values['rh_ra']), P, errors='nan')
+            else:
+                W_RA = W_OA
+            W_MA = OAFraction * W_OA + (1 - OAFraction) * W_RA
+            if 'rh_sa' in values:
+                W_SA = psyv.GetHumRatioFromRelHum(SAT, fraction(values['rh_sa']), P, errors='nan')
+            else:
+                W_SA = np.minimum(W_MA, psyv.GetSatHumRatio(SAT, P, errors='nan'))
+
+            h_OA = psyv.GetMoistAirEnthalpy(OAT, W_OA, errors='nan')
+            h_RA = psyv.GetMoistAirEnthalpy(RAT, W_RA, errors='nan')
+            h_MA = psyv.GetMoistAirEnthalpy(MAT, W_MA, errors='nan')
+            h_SA = psyv.GetMoistAirEnthalpy(SAT, W_SA, errors='nan')
+
+            # Dry air mass flow through the coil, per second [SI] or per hour [IP]
+            MassFlow = values['airflow'] / psyv.GetMoistAirVolume(MAT, W_MA, P, errors='nan')
+            if ip:
+                MassFlow = MassFlow * 60
+                SensibleLoad = MassFlow * (0.240 + 0.444 * W_MA) * (MAT - SAT)
+            else:
+                # Enthalpies are in J/kg
+                SensibleLoad = MassFlow * (1006. + 1860. * W_MA) * (MAT - SAT)
+            TotalLoad = MassFlow * (h_MA - h_SA)
+
+            # Cooling 100% outdoor air would have done on top of the mix, when it is the better source
+            EconomizerPotential = np.where(h_OA < h_RA, MassFlow * np.clip(h_MA - np.maximum(h_OA, h_SA), 0, None), 0.)
+            EconomizerPotential[np.isnan(h_OA) | np.isnan(h_MA)] = np.nan
+
+        self.loads = pd.DataFrame({
+            'OA fraction': OAFraction,
+            'HumRatio OA': W_OA, 'HumRatio MA': W_MA, 'HumRatio SA': W_SA,
+            'Enthalpy OA': h_OA, 'Enthalpy RA': h_RA, 'Enthalpy MA': h_MA, 'Enthalpy SA': h_SA,
+            'Dry air mass flow': MassFlow,
+            'Sensible load': SensibleLoad, 'Latent load': TotalLoad - SensibleLoad, 'Total load': TotalLoad,
+            'Economizer potential': EconomizerPotential,
+        }, index=index)
+        return self.loads
+
+    def energy(self, loads=None):
+        """
+        Integrates the loads over time, each row lasting until the next one (the last one as long as the median step).  
+
+        **Parameters:**  
+        >**loads:** *DataFrame, default:* `None`  
+        >>Output of `computeLoads`. Defaults to `self.loads`
+
+        **Returns:**  
+        >**Series** of the sensible, latent and total coil energies and economizer potential in kWh [SI] or kBtu [IP],
+        cooling and heating separated
+        """
+        loads = self.loads if loads is None else loads
+        hours = pd.Series(loads.index, index=loads.index).diff().shift(-1).dt.total_seconds() / 3600
+        hours = hours.fillna(hours.median())
+
+        energy = {}
+        for col in ['Sensible load', 'Latent load', 'Total load']:
+            name = col.replace(' load', '')
+            energy[f'{name} cooling'] = (loads[col].clip(lower=0) * hours).sum() / 1000
+            energy[f'{name} heating'] = (-loads[col].clip(upper=0) * hours).sum() / 1000
+        energy['Economizer potential'] = (loads['Economizer potential'] * hours).sum() / 1000
+        return pd.Series(energy, name=self.name)
@@ -6,6 +6,8 @@ from psycopg2.extras import execute_values
 from datetime import datetime
 import logging
 
+from ..wrangle.time_tools import multiResample
+
 def jool_db_conn(database="jool_data",
                         host="localhost",
                         user="postgres",
@@ -326,15 +328,7 @@ def resample_jool_data(df, period="15min"):
     if df.empty:
         return df    
     
-    max_cols = [col for col in df.columns if "ETAT" in col]
-    mean_cols = [col for col in df.columns if col not in max_cols]
-
-    df_max = df.loc[:, max_cols].resample(period).max()
-    df_mean = df.loc[:, mean_cols].resample(period).mean()
-
-    df = pd.concat([df_max, df_mean], axis=1)
-
-    return df
+    return multiResample(df, period, {"ETAT": "max"}, default="mean")
 
 def get_list_connections(conn, reference, children=True, attachments=True):
     connections = get_all_connections(conn, reference, get_attachments=attachments)
@@ -6,6 +6,9 @@ from glob import glob
 # within package/mymodule1.py, for example
 import pkgutil
 import yaml
+import os
+
+import numpy as np
 
 import pandas as pd
 from datetime import date, timedelta, time, datetime
@@ -13,7 +16,90 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 from otters.wrangle.file_loader import import_config
-
+from otters.wrangle import psychrometrics as psy
+from otters.wrangle import psychrometrics_vec as psyv
+
+
+
+# Where the psychrometric chart backgrounds are kept between sessions. See psychroChartLines
+PSYCHRO_CHART_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'otters', 'psychro_charts')
+# Bump when the computation of the backgrounds changes, to ignore older cached files
+PSYCHRO_CHART_VERSION = 1
+
+
+def psychroChartLines(units=None, pressure=None, cache_dir=PSYCHRO_CHART_CACHE):
+    """
+    Computes the background of a psychrometric chart: saturation curve and lines of constant relative humidity,
+    enthalpy and wet-bulb temperature, with the dry bulb on x and the humidity ratio on y (g/kg [SI] or gr/lb [IP]).  
+    Each family of lines is a single array with NaN between the lines, so it is drawn as one trace.  
+    The lines only depend on the unit system and the pressure, so they are computed once and saved in `cache_dir`.
+
+    **Parameters:**  
+    > **units:** *psychrometrics.SI or psychrometrics.IP, default: `None`*  
+    >> Defaults to the unit system set in `psychrometrics`  
+
+    > **pressure:** *float, default: `None`*  
+    >> Atmospheric pressure in Pa [SI] or psi [IP]. Defaults to the standard sea-level pressure  
+
+    > **cache_dir:** *str or None, default: `PSYCHRO_CHART_CACHE`*  
+    >> Folder of the cached backgrounds. None to always recompute  
+
+    **Returns:**  
+    > **dict** of family name: (x, y) arrays. Families are 'Saturation', 'RH', 'Enthalpy' and 'Wet bulb'
+    """
+    if units is None:
+        units = psy.GetUnitSystem()
+    ip = units == psy.IP
+    if pressure is None:
+        pressure = 14.696 if ip else 101325.
+
+    path = None
+    if cache_dir:
+        path = os.path.join(cache_dir, f"v{PSYCHRO_CHART_VERSION}_{units.name}_{pressure:.6g}.npz")
+        if os.path.exists(path):
+            with np.load(path) as cached:
+                return {family: (cached[f'{family}_x'], cached[f'{family}_y']) for family in ['Saturation', 'RH', 'Enthalpy', 'Wet bulb']}
+
+    # Chart range and line spacing
+    if ip:
+        tdb = np.linspace(14., 122., 217)
+        scale, w_max = 7000., 210.
+        enthalpies, wet_bulbs = np.arange(5., 60., 5.), np.arange(20., 90., 10.)
+    else:
+        tdb = np.linspace(-10., 50., 241)
+        scale, w_max = 1000., 30.
+        enthalpies, wet_bulbs = np.arange(0., 130000., 10000.), np.arange(-5., 35., 5.)
+
+    def family(y):
+        # Lines (rows) joined with NaN in between and cut at the top of the chart
+        y = np.where(y * scale <= w_max, y * scale, np.nan)
+        gap = np.full((len(y), 1), np.nan)
+        x = np.broadcast_to(tdb, y.shape)
+        return np.hstack([x, gap]).ravel(), np.hstack([y, gap]).ravel()
+
+    with psyv.UnitSystemContext(units):
+        saturation = psyv.GetSatHumRatio(tdb, pressure)
+        rh = psyv.GetHumRatioFromRelHum(tdb, np.arange(0.1, 1., 0.1)[:, None], pressure)
+
+        enthalpy = psyv.GetHumRatioFromEnthalpyAndTDryBulb(enthalpies[:, None], tdb, errors='nan')
+        enthalpy = np.where((enthalpy > psy.MIN_HUM_RATIO) & (enthalpy <= saturation), enthalpy, np.nan)
+
+        # Each wet-bulb line starts on the saturation curve, where the dry bulb equals the wet bulb
+        twb = np.broadcast_to(wet_bulbs[:, None], (len(wet_bulbs), len(tdb)))
+        wet_bulb = psyv.GetHumRatioFromTWetBulb(np.maximum(tdb, twb), twb, pressure)
+        wet_bulb = np.where((tdb >= twb) & (wet_bulb > psy.MIN_HUM_RATIO) & (wet_bulb <= saturation), wet_bulb, np.nan)
+
+    lines = {
+        'Saturation': family(saturation[None, :]),
+        'RH': family(rh),
+        'Enthalpy': family(enthalpy),
+        'Wet bulb': family(wet_bulb),
+    }
+
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(path, **{f'{name}_{axis}': values for name, xy in lines.items() for axis, values in zip('xy', xy)})
+    return lines
 
 
 class Graph():
@@ -199,6 +285,76 @@ class Plot(Graph):
         self.formatYAxis()
         return
     
+    def addPsychroChart(self, tdbCol, rhCol=None, humRatioCol=None, pressure=None, units=None, bins=None,
+                        cache_dir=PSYCHRO_CHART_CACHE, **kwargs):
+        """
+        Draws the states of the df on a psychrometric chart.  
+        The background comes from `psychroChartLines` (cached on disk), the states are drawn with WebGL, or binned
+        in 2D with `bins` for very dense data.
+
+        **Parameters:**  
+        > **tdbCol:** *str, required*  
+        >> Dry-bulb temperature column  
+
+        > **rhCol:** *str, default: `None`*  
+        >> Relative humidity column, in % or [0, 1]. Either this or `humRatioCol` is required  
+
+        > **humRatioCol:** *str, default: `None`*  
+        >> Humidity ratio column, in kg/kg [SI] or lb/lb [IP]  
+
+        > **pressure:** *float, default: `None`*  
+        >> Atmospheric pressure. Defaults to the standard sea-level pressure  
+
+        > **units:** *psychrometrics.SI or psychrometrics.IP, default: `None`*  
+        >> Defaults to the unit system set in `psychrometrics`  
+
+        > **bins:** *int, default: `None`*  
+        >> Number of bins per axis of a 2D histogram drawn instead of the individual states  
+
+        > **kwargs:** *optional*  
+        >> Passed to the plotly trace of the states  
+        """
+        if units is None:
+            units = psy.GetUnitSystem()
+        ip = units == psy.IP
+        if pressure is None:
+            pressure = 14.696 if ip else 101325.
+        scale = 7000. if ip else 1000.
+
+        for family, (x, y) in psychroChartLines(units, pressure, cache_dir).items():
+            self.fig.add_trace(go.Scattergl(
+                x=x, y=y, mode='lines', name=family, hoverinfo='skip', connectgaps=False,
+                line=dict(color='#262626' if family == 'Saturation' else 'rgba(38, 38, 38, 0.25)',
+                          width=1.5 if family == 'Saturation' else 0.75),
+            ))
+
+        tdb = self.df[tdbCol].to_numpy(dtype=float)
+        if humRatioCol is not None:
+            humRatio = self.df[humRatioCol].to_numpy(dtype=float)
+        elif rhCol is not None:
+            rh = self.df[rhCol].to_numpy(dtype=float)
+            rh = rh / 100 if np.nanmax(rh, initial=0) > 1.5 else rh
+            with psyv.UnitSystemContext(units):
+                humRatio = psyv.GetHumRatioFromRelHum(tdb, rh, pressure, errors='nan')
+        else:
+            raise ValueError("Pass either rhCol or humRatioCol")
+
+        if bins:
+            self.fig.add_trace(go.Histogram2d(x=tdb, y=humRatio * scale, nbinsx=bins, nbinsy=bins, name='States',
+                                              colorscale='Blues', showscale=False, zmin=1, **kwargs))
+        else:
+            self.fig.add_trace(go.Scattergl(x=tdb, y=humRatio * scale, mode='markers', name='States',
+                                            marker=dict(size=3, opacity=0.5), **kwargs))
+
+        self.xTitle = self.xTitle or ('Dry bulb (°F)' if ip else 'Dry bulb (°C)')
+        self.yTitle = self.yTitle or ('Humidity ratio (gr/lb)' if ip else 'Humidity ratio (g/kg)')
+        self.formatXAxis()
+        # Undo the date ticks set up by timeFormatXAxis when the trends have a DatetimeIndex
+        self.fig.update_xaxes(type='linear', tickformat=None, tick0=None, dtick=None)
+        self.fig.update_xaxes(range=[14, 122] if ip else [-10, 50])
+        self.fig.update_yaxes(range=[0, 210 if ip else 30], title_text=self.yTitle, secondary_y=False)
+        return
+
     def formatXAxis(self):
 
         self.fig.update_xaxes(
@@ -5,4 +5,4 @@ The wrangler sub module is for tools to 'wrangle' data, meaning to clean, organi
 
 
 
-__all__ = ['time_tools', 'wrangler', 'psychrometrics', 'db_loader', 'file_loader']
\ No newline at end of file
+__all__ = ['time_tools', 'wrangler', 'psychrometrics', 'psychrometrics_vec', 'db_loader', 'file_loader']
\ No newline at end of file
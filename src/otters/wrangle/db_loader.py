@@ -4,8 +4,15 @@ import collections
 import pandas as pd
 import requests
 import json
+import warnings
 from datetime import datetime, timedelta
 
+from . import psychrometrics as psy
+from . import psychrometrics_vec as psyv
+
+# Station pressure of each plant, keyed on (db_loc, plant, unit system). See getPlantPressure
+_plant_pressures = {}
+
 def create_db(db_file: str) -> None:
     """
     Create an SQLite database if none exists.  
@@ -273,4 +280,63 @@ def getNasaWeather(plant: str = '', dates: list = [datetime.today()-timedelta(da
 
     dfWeather[dfWeather == -999] = 0
 
-    return dfWeather
\ No newline at end of file
+    return dfWeather
+
+def getPlantPressure(plants: str | list, db_loc: str = r"Z:\Data Governance\Databases\leidos_meta.db",
+                     units: psy.UnitSystem | None = None, refresh: bool = False) -> float | pd.Series:
+    """
+    Get the standard-atmosphere pressure at one or several plants, from their altitude in the db.  
+    Reads the `altitude` column (in metres) next to the latitude and longitude of the `plants` table.  
+    Pressures are cached per plant, so the db is only read for plants that were never asked for and the
+    result can be broadcast into the psychrometric functions for free, e.g.  
+    `df['Pressure'] = df['plant'].map(getPlantPressure(df['plant'].unique()))`  
+    Plants without an altitude get the sea-level pressure, with a warning.
+
+    **Parameters:**  
+    > **plants:** *str or list of strs, required*  
+    >> The name(s) of the plant(s) in the database  
+
+    > **db_loc:** *String, default: `"Z:\\Data Governance\\Databases\\leidos_meta.db"`*  
+    >> Path to the database with plant coordinates  
+
+    > **units:** *psychrometrics.SI or psychrometrics.IP, default: `None`*  
+    >> Unit system of the pressure (Pa or psi). Defaults to the one set in `psychrometrics`  
+
+    > **refresh:** *bool, default: `False`*  
+    >> Read the altitudes from the db again instead of using the cached pressures  
+
+    **Returns:**  
+    > **float** for a single plant, **pd.Series** indexed by plant for a list
+    """
+    if units is None:
+        units = psy.GetUnitSystem()
+    if not isinstance(units, psy.UnitSystem):
+        raise ValueError("The system of units has not been defined.")
+    names = [plants] if isinstance(plants, str) else list(plants)
+
+    missing = [plant for plant in names if refresh or (db_loc, plant, units) not in _plant_pressures]
+    if missing:
+        conn = create_conn(db_loc)
+        try:
+            df = pd.read_sql("SELECT plant, altitude FROM plants;", conn)
+        finally:
+            conn.close()
+        altitudes = df.drop_duplicates('plant').set_index('plant')['altitude'].reindex(missing)
+
+        unknown = altitudes.index[altitudes.isna()]
+        if len(unknown):
+            warnings.warn(f"No altitude was found for the plants: {', '.join(map(str, unknown))}\n"
+                          "Continuing with the sea-level pressure")
+        altitudes = altitudes.fillna(0).astype(float)
+
+        # Altitudes are in metres, the IP standard atmosphere takes feet
+        if units == psy.IP:
+            pressures = psyv.ip.GetStandardAtmPressure(altitudes.to_numpy() / 0.3048)
+        else:
+            pressures = psyv.si.GetStandardAtmPressure(altitudes.to_numpy())
+        for plant, pressure in zip(missing, pressures):
+            _plant_pressures[(db_loc, plant, units)] = float(pressure)
+
+    if isinstance(plants, str):
+        return _plant_pressures[(db_loc, plants, units)]
+    return pd.Series([_plant_pressures[(db_loc, plant, units)] for plant in names], index=names, name='Pressure')
@@ -11,7 +11,7 @@ import re
 from pathlib import Path
 
 from .wrangler import two_letter_month_to_number
-from .time_tools import selectiveResample, resample_irregular_monthly_events
+from .time_tools import prorateIntervals, resample_irregular_monthly_events
 
 import pymupdf
 import tabula
@@ -333,11 +333,10 @@ def get_table_gaz(file_name, resample=False):
             table['meter_number'] = meter_number
         
             if resample:
-                tableResampled = table.reset_index()
-                tableResampled = pd.concat([tableResampled.set_index('Début'), tableResampled.set_index('Fin')]).drop(["Début", "Fin"], axis=1)
-                tableResampled = tableResampled.resample("D").mean().ffill()
-                tableResampled['Jours'] = 1
-                tableResampled = selectiveResample(tableResampled, 'MS', tableResampled.columns.drop("Jours"), "Jours") 
+                # Énergir periods end on the day the next one starts
+                tableResampled = prorateIntervals(table.index, table['Fin'], table.drop(columns='Fin'), freq='MS',
+                                                  inclusive=False, how='mean', day_col='Jours')
+                tableResampled.index.name = 'Début'
 
                 return tableResampled
             else:
@@ -427,16 +426,10 @@ def get_table_tarif_M(file_name, resample=False):
             table['meter_number'] = meter_number
 
             if resample:
-                tableResampled = table.reset_index()
-
-                tableResampled = pd.concat([tableResampled.set_index('Début'), tableResampled.set_index('Fin')]).drop(["Début", "Fin"], axis=1)
-                tableResampled.index = pd.to_datetime(tableResampled.index)
+                tableResampled = prorateIntervals(table.index, table['Fin'], table.drop(columns='Fin'), freq='MS',
+                                                  inclusive=True, how='mean', day_col='Jours')
                 tableResampled.index.name = 'Timestamp'
 
-                tableResampled = tableResampled.resample("D").mean().ffill()
-                tableResampled['Jours'] = 1
-                tableResampled = selectiveResample(tableResampled, 'MS', tableResampled.columns.drop("Jours"), "Jours") 
-
                 return tableResampled
             else:
                 return table
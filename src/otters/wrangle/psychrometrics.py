@@ -45,8 +45,12 @@
 
 
 import math
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
 from enum import Enum, auto
-from typing import Optional
+from functools import wraps
+from typing import Iterator, Optional
 
 
 #######################################################################################################
@@ -178,6 +182,7 @@ def SetUnitSystem(Units: UnitSystem) -> None:
         # Need to recompile functions when the system of units is changed as Numba considers these global variables compile-time constants.
         # See https://numba.pydata.org/numba-doc/dev/user/faq.html#numba-doesn-t-seem-to-care-when-i-modify-a-global-variable
         globals()['isIP'] = njit(isIP.py_func)
+        globals()['_Tolerance'] = njit(_Tolerance.py_func)
         for func in func_list:
             globals()[func[0]] = vectorize(func[1])
 
@@ -185,21 +190,146 @@ def GetUnitSystem() -> Optional[UnitSystem]:
     """
     Return system of units in use.
 
+    Notes:
+        With Numba, the functions of this module are compiled and always use the global unit system,
+        which is then what this returns, even inside a `psychrometrics_vec.UnitSystemContext`.
+
     """
-    return PSYCHROLIB_UNITS
+    Units = _CONTEXT_UNITS.get()
+    return PSYCHROLIB_UNITS if Units is None else Units
 
 def isIP() -> bool:
     """
     Check whether the system in use is IP or SI.
 
     """
-    if PSYCHROLIB_UNITS == IP:
+    Units = _CONTEXT_UNITS.get()
+    if Units is None:
+        Units = PSYCHROLIB_UNITS
+
+    if Units == IP:
         return True
-    elif PSYCHROLIB_UNITS == SI:
+    elif Units == SI:
         return False
     else:
         raise ValueError('The system of units has not been defined.')
 
+def _Tolerance() -> float:
+    """
+    Return the tolerance of temperature calculations for the system of units in use.
+
+    """
+    Units = _CONTEXT_UNITS.get()
+    if Units is None:
+        return PSYCHROLIB_TOLERANCE
+    return 0.001 * 9. / 5. if Units == IP else 0.001
+
+# Context aware versions, kept for psychrometrics_vec as the Numba section below replaces isIP and _Tolerance
+# by compiled functions that only read the global unit system.
+_ContextIsIP = isIP
+_ContextTolerance = _Tolerance
+_ContextUnitSystem = GetUnitSystem
+
+# Unit system set for the current thread or task only, which takes precedence over PSYCHROLIB_UNITS.
+_CONTEXT_UNITS: ContextVar[Optional[UnitSystem]] = ContextVar('PSYCHROLIB_CONTEXT_UNITS', default=None)
+
+def UnitSystemContext(Units: UnitSystem):
+    """
+    Use a system of units (SI or IP) inside a `with` block, for the current thread or task only.
+
+    Args:
+        Units: system of units chosen (SI or IP)
+
+    Raises:
+        RuntimeError: if Numba is installed, as the functions of this module are then compiled and only
+            follow `SetUnitSystem`. Use `psychrometrics_vec.UnitSystemContext` instead.
+
+    Notes:
+        Unlike `SetUnitSystem`, the global unit system is left untouched, so SI and IP computations
+        can run concurrently, e.g. on a thread pool. Contexts can be nested.
+
+    Example:
+        >>> with UnitSystemContext(IP):
+        ...     TDewPoint = GetTDewPointFromRelHum(77.0, 0.80)
+
+    """
+    if has_numba:
+        raise RuntimeError("Unit system contexts are not supported by the Numba compiled functions of this module, "
+                           "use psychrometrics_vec.UnitSystemContext or SetUnitSystem instead.")
+    return _UnitSystemContext(Units)
+
+@contextmanager
+def _UnitSystemContext(Units: UnitSystem) -> Iterator[None]:
+    """
+    Set the context unit system, read by `_ContextIsIP` and `_ContextTolerance`, inside a `with` block.
+
+    """
+    if not isinstance(Units, UnitSystem):
+        raise ValueError("The system of units has to be either SI or IP.")
+
+    token = _CONTEXT_UNITS.set(Units)
+    try:
+        yield
+    finally:
+        _CONTEXT_UNITS.reset(token)
+
+class UnitNamespace:
+    """
+    Functions of a psychrometrics module bound to a system of units.
+
+    Attribute access returns the function of the same name, running in a `UnitSystemContext`. Every call,
+    nested calls included, uses the bound unit system independently of `SetUnitSystem` and of other
+    threads. The functions still read the unit system from the context, each time they need it, so
+    this saves no work against `SetUnitSystem`. The module level instances `si` and `ip` are usually all
+    that is needed.
+
+    Args:
+        module: module holding the functions, e.g. `psychrometrics` or `psychrometrics_vec`
+        Units: system of units the functions are bound to (SI or IP)
+
+    Raises:
+        RuntimeError: on function lookup if the module is `psychrometrics` and Numba is installed, as its
+            compiled functions only follow `SetUnitSystem`. `si` and `ip` are then those of
+            `psychrometrics_vec`.
+
+    Example:
+        >>> from otters.wrangle import psychrometrics as psy
+        >>> psy.ip.GetTDewPointFromRelHum(77.0, 0.80)
+
+    """
+    def __init__(self, module, Units: UnitSystem):
+        if not isinstance(Units, UnitSystem):
+            raise ValueError("The system of units has to be either SI or IP.")
+        self._module = module
+        self._units = Units
+
+    def __getattr__(self, name):
+        if not name.startswith(('Get', 'Calc')) or name == 'GetUnitSystem':
+            raise AttributeError(name)
+        if has_numba and self._module is sys.modules[__name__]:
+            raise RuntimeError("Unit system namespaces are not supported by the Numba compiled functions of this module, "
+                               "use psychrometrics_vec.si and psychrometrics_vec.ip instead.")
+        func = getattr(self._module, name)
+        Units = self._units
+
+        @wraps(func)
+        def bound(*args, **kwargs):
+            token = _CONTEXT_UNITS.set(Units)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _CONTEXT_UNITS.reset(token)
+
+        # Cache the bound function so that later lookups skip __getattr__
+        setattr(self, name, bound)
+        return bound
+
+    def __dir__(self):
+        return [name for name in dir(self._module) if name.startswith(('Get', 'Calc')) and name != 'GetUnitSystem']
+
+    def __repr__(self):
+        return f'<{self._module.__name__} functions in {self._units.name} units>'
+
 
 #######################################################################################################
 # Conversion between temperature units
@@ -563,7 +693,7 @@ def GetTDewPointFromVapPres(TDryBulb: float, VapPres: float) -> float:
         TDewPoint = max(TDewPoint, BOUNDS[0])
         TDewPoint = min(TDewPoint, BOUNDS[1])
 
-        if ((math.fabs(TDewPoint - TDewPoint_iter) <= PSYCHROLIB_TOLERANCE)):
+        if ((math.fabs(TDewPoint - TDewPoint_iter) <= _Tolerance())):
             break
 
         if (index > MAX_ITER_COUNT):
@@ -623,9 +753,10 @@ def GetTWetBulbFromHumRatio(TDryBulb: float, HumRatio: float, Pressure: float) -
     TWetBulbInf = TDewPoint
     TWetBulb = (TWetBulbInf + TWetBulbSup) / 2
 
+    Tolerance = _Tolerance()
     index = 1
     # Bisection loop
-    while ((TWetBulbSup - TWetBulbInf) > PSYCHROLIB_TOLERANCE):
+    while ((TWetBulbSup - TWetBulbInf) > Tolerance):
 
         # Compute humidity ratio at temperature Tstar
         Wstar = GetHumRatioFromTWetBulb(TDryBulb, TWetBulb, Pressure)
@@ -1478,13 +1609,53 @@ try:
 
     has_numba = True
     # Needs to compile as used in vectorized functions below.
+    # Compiled code cannot read the context variable, so it only follows the global unit system.
+    def isIP() -> bool:
+        if PSYCHROLIB_UNITS == IP:
+            return True
+        elif PSYCHROLIB_UNITS == SI:
+            return False
+        else:
+            raise ValueError('The system of units has not been defined.')
+
+    def _Tolerance() -> float:
+        return PSYCHROLIB_TOLERANCE
+
+    def GetUnitSystem() -> Optional[UnitSystem]:
+        """
+        Return system of units in use, the global one that the compiled functions follow.
+
+        """
+        return PSYCHROLIB_UNITS
+
     isIP = njit(isIP)
+    _Tolerance = njit(_Tolerance)
     # Vectorise all 'core' functions. 
     # Utility function are excluded as they are just wrappers.
     func_list = []
     for func in list(globals().items()):
-        if isfunction(func[1]) and func[0].startswith(('Get', 'dLnPws_')) and func != 'GetUnitSystem':
+        if isfunction(func[1]) and func[0].startswith(('Get', 'dLnPws_')) and func[0] != 'GetUnitSystem':
             globals()[func[0]] = vectorize(func[1])
             func_list.append(func)
 except ImportError:
-    has_numba = False
\ No newline at end of file
+    has_numba = False
+
+
+if has_numba:
+    # The compiled functions can't follow a unit system context, the array versions can and take scalars too.
+    # They are imported on first use as psychrometrics_vec imports this module.
+    def __getattr__(name):
+        if name in ('si', 'ip'):
+            from . import psychrometrics_vec
+            return getattr(psychrometrics_vec, name)
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+else:
+    si = UnitNamespace(sys.modules[__name__], SI)
+    """UnitNamespace: Functions of this module in SI units, those of `psychrometrics_vec` with Numba.
+
+    """
+
+    ip = UnitNamespace(sys.modules[__name__], IP)
+    """UnitNamespace: Functions of this module in IP units, those of `psychrometrics_vec` with Numba.
+
+    """
@@ -0,0 +1,1553 @@
+"""
+Array-aware (NumPy) versions of the functions in :mod:`otters.wrangle.psychrometrics`.
+
+Every function keeps the name, argument order and units of its scalar counterpart, but accepts
+floats, NumPy arrays or pandas Series and returns the same shape. Series in gives a Series out
+(indexed like the first Series passed), scalars in give floats out.
+
+The unit system is shared with the scalar module, so it is still set with
+``psychrometrics.SetUnitSystem``, or for the current thread or task only with ``UnitSystemContext``.
+The ``si`` and ``ip`` namespaces of this module hold the same functions bound to one system of units.
+Both keep working when Numba compiles the scalar module, unlike ``psychrometrics.UnitSystemContext``.
+
+Example
+    >>> from otters.wrangle import psychrometrics, psychrometrics_vec
+    >>> psychrometrics.SetUnitSystem(psychrometrics.SI)
+    >>> df['TDewPoint'] = psychrometrics_vec.GetTDewPointFromRelHum(df['OAT'], df['RH'] / 100)
+
+Use this instead of ``df.apply(..., axis=1)`` over the scalar functions: the whole column is
+computed at once, which is orders of magnitude faster on long trends.
+
+Out-of-range inputs raise ``ValueError`` like the scalar functions do. Every function also takes
+``errors='nan'`` to set the offending elements to NaN instead, or ``errors='clip'`` to clip them to
+their range of validity, and ``return_mask=True`` to also get a boolean mask of the elements with a
+finite result. A dirty year of sensor data is then processed in one pass:
+
+    >>> values, valid = psychrometrics_vec.CalcPsychrometricsFromRelHum(
+    ...     df['OAT'], df['RH'] / 100, 101325., errors='nan', return_mask=True)
+    >>> df[~valid]  # rows to look at
+"""
+
+import inspect
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextvars import ContextVar
+from functools import wraps
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from . import psychrometrics as psy
+from .psychrometrics import (
+    ZERO_FAHRENHEIT_AS_RANKINE,
+    ZERO_CELSIUS_AS_KELVIN,
+    R_DA_IP,
+    R_DA_SI,
+    MAX_ITER_COUNT,
+    MIN_HUM_RATIO,
+    FREEZING_POINT_WATER_IP,
+    FREEZING_POINT_WATER_SI,
+    TRIPLE_POINT_WATER_IP,
+    TRIPLE_POINT_WATER_SI,
+)
+
+
+#######################################################################################################
+# Helper functions
+#######################################################################################################
+
+def _wrap(result, index, scalar):
+    """
+    Give a result the same "shape" as the inputs: float for scalars, Series for Series, else ndarray.
+
+    """
+    if isinstance(result, tuple):
+        return tuple(_wrap(item, index, scalar) for item in result)
+    if scalar:
+        return result.item() if isinstance(result, np.ndarray) else result
+    if index is not None:
+        return pd.Series(result, index=index)
+    return result
+
+ERROR_POLICIES = ('raise', 'nan', 'clip')
+"""tuple: Accepted values of the `errors` argument of the functions of this module.
+
+"""
+
+# Error policy of the call in progress, inherited by the functions it calls.
+_ERRORS = ContextVar('psychrometrics_vec_errors', default='raise')
+
+def _invalid(bad, message, value, clipped):
+    """
+    Apply the error policy in use to the elements of `value` flagged as `bad`.
+
+    Raises ValueError ('raise'), or returns `value` with NaN ('nan') or `clipped` ('clip') at the bad elements.
+
+    """
+    if not np.any(bad):
+        return value
+    errors = _ERRORS.get()
+    if errors == 'raise':
+        raise ValueError(message)
+    return np.where(bad, np.nan if errors == 'nan' else clipped, value)
+
+def _bulk(func):
+    """
+    Decorator casting every positional argument to a float ndarray and casting the result(s) back.
+
+    Also adds the keyword arguments `errors` (one of ERROR_POLICIES) and `return_mask` to every function.
+
+    """
+    own_mask = 'return_mask' in inspect.signature(func).parameters
+
+    @wraps(func)
+    def wrapper(*args, errors=None, **kwargs):
+        index = next((arg.index for arg in args if isinstance(arg, pd.Series)), None)
+        arrays = [np.asarray(arg, dtype=float) for arg in args]
+        # 0-d ndarrays stay ndarrays so that the functions can call each other without unwrapping
+        scalar = index is None and all(array.ndim == 0 and not isinstance(arg, np.ndarray)
+                                       for arg, array in zip(args, arrays))
+        return_mask = False if own_mask else kwargs.pop('return_mask', False)
+
+        if errors is None:
+            result = func(*arrays, **kwargs)
+        else:
+            if errors not in ERROR_POLICIES:
+                raise ValueError(f"errors must be one of {ERROR_POLICIES}")
+            token = _ERRORS.set(errors)
+            try:
+                result = func(*arrays, **kwargs)
+            finally:
+                _ERRORS.reset(token)
+
+        if return_mask:
+            outputs = result if isinstance(result, tuple) else (result,)
+            result = result, np.logical_and.reduce([np.isfinite(output) for output in outputs])
+        return _wrap(result, index, scalar)
+    return wrapper
+
+def _broadcast(*arrays):
+    """
+    Broadcast arrays against each other and return writable float copies.
+
+    """
+    shape = np.broadcast_shapes(*(array.shape for array in arrays))
+    return [np.array(np.broadcast_to(array, shape), dtype=float) for array in arrays]
+
+WARM_START_MIN_SIZE = 250000
+"""int: Fewest samples for `time_series` to warm-start the solvers. Each of the 7 warm-start levels is a separate
+solve, and on shorter series their overhead eats the saved iterations: up to 4 times slower at 1000 samples, no
+reliable gain on a year of 5-minute data (105 120 samples). Shorter series are solved cold.
+
+"""
+
+def _warm_start_levels(n, stride=64):
+    """
+    Order in which to solve an ordered series of n samples so that almost every solve is warm-started.
+
+    Yields (positions, sources): first every `stride`-th sample with sources None (cold start), then,
+    halving the stride at each level, the samples halfway between those already solved, together
+    with the solved sample just before each of them. Half of the series is thus seeded from the
+    previous sample, a quarter from two samples before, and so on.
+
+    """
+    positions = np.arange(0, n, stride)
+    yield positions, None
+    while stride > 1:
+        half = stride // 2
+        positions = np.arange(half, n, stride)
+        yield positions, positions - half
+        stride = half
+
+
+#######################################################################################################
+# Conversion between temperature units
+#######################################################################################################
+
+@_bulk
+def GetTRankineFromTFahrenheit(TFahrenheit):
+    """
+    Array version of :func:`psychrometrics.GetTRankineFromTFahrenheit`.
+
+    """
+    return TFahrenheit + ZERO_FAHRENHEIT_AS_RANKINE
+
+@_bulk
+def GetTFahrenheitFromTRankine(TRankine):
+    """
+    Array version of :func:`psychrometrics.GetTFahrenheitFromTRankine`.
+
+    """
+    return TRankine - ZERO_FAHRENHEIT_AS_RANKINE
+
+@_bulk
+def GetTKelvinFromTCelsius(TCelsius):
+    """
+    Array version of :func:`psychrometrics.GetTKelvinFromTCelsius`.
+
+    """
+    return TCelsius + ZERO_CELSIUS_AS_KELVIN
+
+@_bulk
+def GetTCelsiusFromTKelvin(TKelvin):
+    """
+    Array version of :func:`psychrometrics.GetTCelsiusFromTKelvin`.
+
+    """
+    return TKelvin - ZERO_CELSIUS_AS_KELVIN
+
+
+#######################################################################################################
+# Conversions between dew point, wet bulb, and relative humidity
+#######################################################################################################
+
+@_bulk
+def GetTWetBulbFromTDewPoint(TDryBulb, TDewPoint, Pressure):
+    """
+    Array version of :func:`psychrometrics.GetTWetBulbFromTDewPoint`.
+
+    """
+    TDewPoint = _invalid(TDewPoint > TDryBulb, "Dew point temperature is above dry bulb temperature",
+                         TDewPoint, TDryBulb)
+
+    HumRatio = GetHumRatioFromTDewPoint(TDewPoint, Pressure)
+    return GetTWetBulbFromHumRatio(TDryBulb, HumRatio, Pressure)
+
+@_bulk
+def GetTWetBulbFromRelHum(TDryBulb, RelHum, Pressure):
+    """
+    Array version of :func:`psychrometrics.GetTWetBulbFromRelHum`.
+
+    """
+    RelHum = _invalid((RelHum < 0) | (RelHum > 1), "Relative humidity is outside range [0, 1]",
+                      RelHum, np.clip(RelHum, 0, 1))
+
+    HumRatio = GetHumRatioFromRelHum(TDryBulb, RelHum, Pressure)
+    return GetTWetBulbFromHumRatio(TDryBulb, HumRatio, Pressure)
+
+@_bulk
+def GetRelHumFromTDewPoint(TDryBulb, TDewPoint):
+    """
+    Array version of :func:`psychrometrics.GetRelHumFromTDewPoint`.
+
+    """
+    TDewPoint = _invalid(TDewPoint > TDryBulb, "Dew point temperature is above dry bulb temperature",
+                         TDewPoint, TDryBulb)
+
+    return GetSatVapPres(TDewPoint) / GetSatVapPres(TDryBulb)
+
+@_bulk
+def GetRelHumFromTWetBulb(TDryBulb, TWetBulb, Pressure):
+    """
+    Array version of :func:`psychrometrics.GetRelHumFromTWetBulb`.
+
+    """
+    TWetBulb = _invalid(TWetBulb > TDryBulb, "Wet bulb temperature is above dry bulb temperature",
+                        TWetBulb, TDryBulb)
+
+    HumRatio = GetHumRatioFromTWetBulb(TDryBulb, TWetBulb, Pressure)
+    return GetRelHumFromHumRatio(TDryBulb, HumRatio, Pressure)
+
+@_bulk
+def GetTDewPointFromRelHum(TDryBulb, RelHum):
+    """
+    Array version of :func:`psychrometrics.GetTDewPointFromRelHum`.
+
+    """
+    RelHum = _invalid((RelHum < 0) | (RelHum > 1), "Relative humidity is outside range [0, 1]",
+                      RelHum, np.clip(RelHum, 0, 1))
+
+    VapPres = GetVapPresFromRelHum(TDryBulb, RelHum)
+    return GetTDewPointFromVapPres(TDryBulb, VapPres)
+
+@_bulk
+def GetTDewPointFromTWetBulb(TDryBulb, TWetBulb, Pressure):
+    """
+    Array version of :func:`psychrometrics.GetTDewPointFromTWetBulb`.
+
+    """
+    TWetBulb = _invalid(TWetBulb > TDryBulb, "Wet bulb temperature is above dry bulb temperature",
+                        TWetBulb, TDryBulb)
+
+    HumRatio = GetHumRatioFromTWetBulb(TDryBulb, TWetBulb, Pressure)
+    return GetTDewPointFromHumRatio(TDryBulb, HumRatio, Pressure)
+
+
+#######################################################################################################
+# Conversions between dew point, or relative humidity and vapor pressure
+#######################################################################################################
+
+@_bulk
+def GetVapPresFromRelHum(TDryBulb, RelHum):
+    """
+    Array version of :func:`psychrometrics.GetVapPresFromRelHum`.
+
+    """
+    RelHum = _invalid((RelHum < 0) | (RelHum > 1), "Relative humidity is outside range [0, 1]",
+                      RelHum, np.clip(RelHum, 0, 1))
+
+    return RelHum * GetSatVapPres(TDryBulb)
+
+@_bulk
+def GetRelHumFromVapPres(TDryBulb, VapPres):
+    """
+    Array version of :func:`psychrometrics.GetRelHumFromVapPres`.
+
+    """
+    VapPres = _invalid(VapPres < 0, "Partial pressure of water vapor in moist air cannot be negative", VapPres, 0.)
+
+    return VapPres / GetSatVapPres(TDryBulb)
+
+@_bulk
+def dLnPws_(TDryBulb):
+    """
+    Array version of :func:`psychrometrics.dLnPws_`.
+
+    """
+    if psy._ContextIsIP():
+        T = GetTRankineFromTFahrenheit(TDryBulb)
+        return np.where(TDryBulb <= TRIPLE_POINT_WATER_IP, _dLnPwsFormula(T, True, True), _dLnPwsFormula(T, True, False))
+    T = GetTKelvinFromTCelsius(TDryBulb)
+    return np.where(TDryBulb <= TRIPLE_POINT_WATER_SI, _dLnPwsFormula(T, False, True), _dLnPwsFormula(T, False, False))
+
+@_bulk
+def GetTDewPointFromVapPres(TDryBulb, VapPres, return_mask=False, guess=None, time_series=False):
+    """
+    Array version of :func:`psychrometrics.GetTDewPointFromVapPres`.
+
+    Args:
+        TDryBulb : Dry-bulb temperature in °F [IP] or °C [SI]
+        VapPres: Partial pressure of water vapor in moist air in Psi [IP] or Pa [SI]
+        return_mask : Also return a boolean mask of the elements that converged
+        guess : Starting point of the iterations instead of the dry bulb, e.g. a previous solution.
+                NaN elements start from the dry bulb
+        time_series : The inputs are an ordered 1-D series of slowly varying samples (e.g. a trend):
+                      start every sample from the solution of a nearby earlier sample. Ignored below
+                      WARM_START_MIN_SIZE samples, where it would be slower
+
+    Returns:
+        Dew-point temperature in °F [IP] or °C [SI], and the convergence mask if `return_mask`
+
+    Notes:
+        Batched version of the scalar Newton-Raphson solver. All elements are iterated together
+        and converged elements are dropped from the active set, so each iteration only works on
+        the elements still moving. Unlike the scalar function this never raises: elements with a
+        vapor pressure outside the range of validity, NaN inputs, or elements that have not
+        converged after MAX_ITER_COUNT iterations come back as NaN and False in the mask.
+        Started close to the solution, Newton-Raphson needs fewer iterations, hence `guess` and
+        `time_series` (about 2 instead of 3.5 on a 5-minute trend).
+
+    """
+    if psy._ContextIsIP():
+        BOUNDS = [-148, 392]
+    else:
+        BOUNDS = [-100, 200]
+
+    TDryBulb, VapPres = _broadcast(TDryBulb, VapPres)
+    shape = TDryBulb.shape
+    TDryBulb, VapPres = TDryBulb.ravel(), VapPres.ravel()
+
+    if time_series and TDryBulb.size >= WARM_START_MIN_SIZE:
+        TDewPoint = np.full(TDryBulb.shape, np.nan)
+        converged = np.zeros(TDryBulb.shape, dtype=bool)
+        for positions, sources in _warm_start_levels(TDryBulb.size):
+            TDewPoint[positions], converged[positions] = GetTDewPointFromVapPres(
+                TDryBulb[positions], VapPres[positions], return_mask=True,
+                guess=None if sources is None else TDewPoint[sources])
+        TDewPoint, converged = TDewPoint.reshape(shape), converged.reshape(shape)
+        return (TDewPoint, converged) if return_mask else TDewPoint
+
+    TDewPoint = np.full(TDryBulb.shape, np.nan)
+    converged = np.zeros(TDryBulb.shape, dtype=bool)
+
+    # Validity check -- bounds outside which a solution cannot be found
+    valid = (np.isfinite(TDryBulb) & (VapPres >= GetSatVapPres(BOUNDS[0]))
+             & (VapPres <= GetSatVapPres(BOUNDS[1])))
+
+    # Active set: positions still iterating, their current estimate and their target
+    active = np.flatnonzero(valid)
+    TDewPoint_iter = TDryBulb[active]
+    if guess is not None:
+        guess = np.broadcast_to(np.asarray(guess, dtype=float), shape).ravel()[active]
+        TDewPoint_iter = np.where(np.isnan(guess), TDewPoint_iter, guess)
+    TDewPoint_iter = np.clip(TDewPoint_iter, BOUNDS[0], BOUNDS[1])
+    lnVP = np.log(VapPres[active])
+
+    for _ in range(MAX_ITER_COUNT + 1):
+        if active.size == 0:
+            break
+        lnVP_iter = _LnPws(TDewPoint_iter)
+
+        # Derivative of function, calculated analytically
+        d_lnVP = dLnPws_(TDewPoint_iter)
+
+        # New estimate, bounded by the search domain defined above
+        TDewPoint_new = np.clip(TDewPoint_iter - (lnVP_iter - lnVP) / d_lnVP, BOUNDS[0], BOUNDS[1])
+
+        done = np.abs(TDewPoint_new - TDewPoint_iter) <= psy._ContextTolerance()
+        TDewPoint[active[done]] = TDewPoint_new[done]
+        converged[active[done]] = True
+
+        moving = ~done
+        active, TDewPoint_iter, lnVP = active[moving], TDewPoint_new[moving], lnVP[moving]
+
+    TDewPoint = np.minimum(TDewPoint, TDryBulb).reshape(shape)
+    if return_mask:
+        return TDewPoint, converged.reshape(shape)
+    return TDewPoint
+
+@_bulk
+def GetVapPresFromTDewPoint(TDewPoint):
+    """
+    Array version of :func:`psychrometrics.GetVapPresFromTDewPoint`.
+
+    """
+    return GetSatVapPres(TDewPoint)
+
+
+#######################################################################################################
+# Conversions from wet-bulb temperature, dew-point temperature, or relative humidity to humidity ratio
+#######################################################################################################
+
+@_bulk
+def GetTWetBulbFromHumRatio(TDryBulb, HumRatio, Pressure, tol=None, max_iter=MAX_ITER_COUNT,
+                            method='bisection', return_iterations=False, TDewPoint=None, guess=None,
+                            guess_width=None, time_series=False):
+    """
+    Array version of :func:`psychrometrics.GetTWetBulbFromHumRatio`.
+
+    Args:
+        TDryBulb : Dry-bulb temperature in °F [IP] or °C [SI]
+        HumRatio : Humidity ratio in lb_H₂O lb_Air⁻¹ [IP] or kg_H₂O kg_Air⁻¹ [SI]
+        Pressure : Atmospheric pressure in Psi [IP] or Pa [SI]
+        tol : Tolerance on the wet-bulb temperature. Defaults to the unit system tolerance
+        max_iter : Maximum number of iterations per element
+        method : 'bisection' (same steps as the scalar function) or 'illinois' (bracketed secant)
+        return_iterations : Also return the number of iterations each element needed
+        TDewPoint : Dew-point temperature of the same air, if already known, to skip solving for it
+        guess : Estimate of the wet-bulb temperature, e.g. a previous solution, used to narrow the bracket.
+                NaN elements use the full bracket
+        guess_width : Half-width of the bracket around `guess`. Defaults to 10 times `tol`
+        time_series : The inputs are an ordered 1-D series of slowly varying samples (e.g. a trend):
+                      bracket every sample around the solution of a nearby earlier sample. Ignored below
+                      WARM_START_MIN_SIZE samples, where it would be slower
+
+    Returns:
+        Wet-bulb temperature in °F [IP] or °C [SI], and the iteration counts if `return_iterations`
+
+    Notes:
+        Every element is bracketed between its dew point and its dry bulb and all brackets are
+        refined together; elements leave the active set as soon as they converge.
+        With 'bisection' the results are the same as the scalar version. 'illinois' is a
+        modified regula falsi: it keeps the bracket (so it cannot diverge) but usually converges
+        in about 6 iterations instead of 13. Both stop when the bracket is narrower than `tol`.
+        Within about half a degree of freezing the ASHRAE wet-bulb equations are discontinuous and
+        can have two roots; there 'illinois' may return the other root than 'bisection'.
+        Elements that have not converged after `max_iter` iterations come back as NaN.
+        With a `guess`, each end of the narrowed bracket is kept only if it still brackets the root
+        (two extra evaluations), so a bad guess costs a little time but never the result. In
+        `time_series` mode each sample is guessed at the same relative position between its dew point
+        and dry bulb as the seeding sample, within 1% of the wet-bulb depression. On a 5-minute
+        trend this takes 'bisection' from 13 to about 8 iterations and 'illinois' from 6 to 3.
+
+    """
+    HumRatio = _invalid(HumRatio < 0, "Humidity ratio cannot be negative", HumRatio, 0.)
+    if method not in ('bisection', 'illinois'):
+        raise ValueError("method must be either 'bisection' or 'illinois'")
+    if tol is None:
+        tol = psy._ContextTolerance()
+
+    TDryBulb, HumRatio, Pressure = _broadcast(TDryBulb, HumRatio, Pressure)
+    shape = TDryBulb.shape
+    TDryBulb, HumRatio, Pressure = TDryBulb.ravel(), HumRatio.ravel(), Pressure.ravel()
+    BoundedHumRatio = np.maximum(HumRatio, MIN_HUM_RATIO)
+
+    if TDewPoint is None:
+        VapPres = GetVapPresFromHumRatio(BoundedHumRatio, Pressure)
+        TDewPoint = GetTDewPointFromVapPres(TDryBulb, VapPres, time_series=time_series)
+    else:
+        TDewPoint = np.broadcast_to(np.asarray(TDewPoint, dtype=float), shape).ravel()
+
+    if time_series and TDryBulb.size >= WARM_START_MIN_SIZE:
+        TWetBulb = np.full(TDryBulb.shape, np.nan)
+        iterations = np.zeros(TDryBulb.shape, dtype=int)
+        for positions, sources in _warm_start_levels(TDryBulb.size):
+            if sources is None:
+                guess, guess_width = None, None
+            else:
+                # The wet bulb keeps about the same relative position between dew point and dry bulb
+                Depression = TDryBulb[positions] - TDewPoint[positions]
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    Fraction = (TWetBulb[sources] - TDewPoint[sources]) / (TDryBulb[sources] - TDewPoint[sources])
+                guess = TDewPoint[positions] + np.nan_to_num(Fraction, nan=0.5) * Depression
+                guess_width = 0.01 * Depression + tol
+            TWetBulb[positions], iterations[positions] = GetTWetBulbFromHumRatio(
+                TDryBulb[positions], HumRatio[positions], Pressure[positions], tol=tol, max_iter=max_iter,
+                method=method, return_iterations=True, TDewPoint=TDewPoint[positions], guess=guess,
+                guess_width=guess_width)
+        TWetBulb, iterations = TWetBulb.reshape(shape), iterations.reshape(shape)
+        return (TWetBulb, iterations) if return_iterations else TWetBulb
+
+    # Initial guesses
+    TWetBulb = (TDewPoint + TDryBulb) / 2
+    iterations = np.zeros(TDryBulb.shape, dtype=int)
+
+    # Active set: positions still iterating and their bracket
+    active = np.flatnonzero((TDryBulb - TDewPoint) > tol)
+    TWetBulbSup = TDryBulb[active]
+    TWetBulbInf = TDewPoint[active]
+    TWetBulb_iter = TWetBulb[active]
+
+    def residual(T):
+        # Positive above the wet bulb, negative below it
+        return GetHumRatioFromTWetBulb(TDryBulb[active], T, Pressure[active]) - BoundedHumRatio[active]
+
+    if guess is not None:
+        if guess_width is None:
+            guess_width = 10 * tol
+        guess = np.broadcast_to(np.asarray(guess, dtype=float), shape).ravel()[active]
+        guess_width = np.broadcast_to(np.asarray(guess_width, dtype=float), shape).ravel()[active]
+        # Keep each end of the narrowed bracket only if the root is still on the right side of it
+        Inf = np.clip(guess - guess_width, TWetBulbInf, TWetBulbSup)
+        Sup = np.clip(guess + guess_width, TWetBulbInf, TWetBulbSup)
+        TWetBulbInf = np.where(residual(Inf) <= 0, Inf, TWetBulbInf)
+        TWetBulbSup = np.where(residual(Sup) > 0, Sup, TWetBulbSup)
+        TWetBulb_iter = (TWetBulbInf + TWetBulbSup) / 2
+
+    if method == 'illinois':
+        ResSup = residual(TWetBulbSup)
+        ResInf = residual(TWetBulbInf)
+        side = np.zeros(active.shape, dtype=int)
+
+    for index in range(1, max_iter + 1):
+        if active.size == 0:
+            break
+
+        if method == 'bisection':
+            above = residual(TWetBulb_iter) > 0
+            TWetBulbSup = np.where(above, TWetBulb_iter, TWetBulbSup)
+            TWetBulbInf = np.where(above, TWetBulbInf, TWetBulb_iter)
+            TWetBulb_new = (TWetBulbSup + TWetBulbInf) / 2
+            done = (TWetBulbSup - TWetBulbInf) <= tol
+        else:
+            # Secant through the bracket, falling back to the midpoint if it degenerates
+            with np.errstate(divide='ignore', invalid='ignore'):
+                TWetBulb_new = (TWetBulbInf * ResSup - TWetBulbSup * ResInf) / (ResSup - ResInf)
+            degenerate = ~((TWetBulb_new > TWetBulbInf) & (TWetBulb_new < TWetBulbSup))
+            TWetBulb_new = np.where(degenerate, (TWetBulbSup + TWetBulbInf) / 2, TWetBulb_new)
+
+            Res = residual(TWetBulb_new)
+            above = Res > 0
+            # Illinois modification: halve the residual of an end point that is kept twice in a row
+            ResInf = np.where(above & (side == 1), ResInf / 2, ResInf)
+            ResSup = np.where(~above & (side == -1), ResSup / 2, ResSup)
+            TWetBulbSup, ResSup = np.where(above, TWetBulb_new, TWetBulbSup), np.where(above, Res, ResSup)
+            TWetBulbInf, ResInf = np.where(above, TWetBulbInf, TWetBulb_new), np.where(above, ResInf, Res)
+            side = np.where(above, 1, -1)
+            done = ((TWetBulbSup - TWetBulbInf) <= tol) | (Res == 0)
+
+        iterations[active] = index
+        TWetBulb[active[done]] = TWetBulb_new[done]
+
+        moving = ~done
+        active, TWetBulb_iter = active[moving], TWetBulb_new[moving]
+        TWetBulbSup, TWetBulbInf = TWetBulbSup[moving], TWetBulbInf[moving]
+        if method == 'illinois':
+            ResSup, ResInf, side = ResSup[moving], ResInf[moving], side[moving]
+
+    # Convergence not reached
+    TWetBulb[active] = np.nan
+
+    TWetBulb = TWetBulb.reshape(shape)
+    if return_iterations:
+        return TWetBulb, iterations.reshape(shape)
+    return TWetBulb
+
+@_bulk
+def GetHumRatioFromTWetBulb(TDryBulb, TWetBulb, Pressure):
+    """
+    Array version of :func:`psychrometrics.GetHumRatioFromTWetBulb`.
+
+    """
+    TWetBulb = _invalid(TWetBulb > TDryBulb, "Wet bulb temperature is above dry bulb temperature",
+                        TWetBulb, TDryBulb)
+
+    Wsstar = GetSatHumRatio(TWetBulb, Pressure)
+
+    if psy._ContextIsIP():
+        HumRatio = np.where(
+            TWetBulb >= FREEZING_POINT_WATER_IP,
+            ((1093 - 0.556 * TWetBulb) * Wsstar - 0.240 * (TDryBulb - TWetBulb))
+                / (1093 + 0.444 * TDryBulb - TWetBulb),
+            ((1220 - 0.04 * TWetBulb) * Wsstar - 0.240 * (TDryBulb - TWetBulb))
+                / (1220 + 0.444 * TDryBulb - 0.48 * TWetBulb),
+        )
+    else:
+        HumRatio = np.where(
+            TWetBulb >= FREEZING_POINT_WATER_SI,
+            ((2501. - 2.326 * TWetBulb) * Wsstar - 1.006 * (TDryBulb - TWetBulb))
+                / (2501. + 1.86 * TDryBulb - 4.186 * TWetBulb),
+            ((2830. - 0.24 * TWetBulb) * Wsstar - 1.006 * (TDryBulb - TWetBulb))
+                / (2830. + 1.86 * TDryBulb - 2.1 * TWetBulb),
+        )
+    # Validity check.
+    return np.maximum(HumRatio, MIN_HUM_RATIO)
+
+@_bulk
+def GetHumRatioFromRelHum(TDryBulb, RelHum, Pressure):
+    """
+    Array version of :func:`psychrometrics.GetHumRatioFromRelHum`.
+
+    """
+    RelHum = _invalid((RelHum < 0) | (RelHum > 1), "Relative humidity is outside range [0, 1]",
+                      RelHum, np.clip(RelHum, 0, 1))
+
+    VapPres = GetVapPresFromRelHum(TDryBulb, RelHum)
+    return GetHumRatioFromVapPres(VapPres, Pressure)
+
+@_bulk
+def GetRelHumFromHumRatio(TDryBulb, HumRatio, Pressure):
+    """
+    Array version of :func:`psychrometrics.GetRelHumFromHumRatio`.
+
+    """
+    HumRatio = _invalid(HumRatio < 0, "Humidity ratio cannot be negative", HumRatio, 0.)
+
+    VapPres = GetVapPresFromHumRatio(HumRatio, Pressure)
+    return GetRelHumFromVapPres(TDryBulb, VapPres)
+
+@_bulk
+def GetHumRatioFromTDewPoint(TDewPoint, Pressure):
+    """
+    Array version of :func:`psychrometrics.GetHumRatioFromTDewPoint`.
+
+    """
+    VapPres = GetSatVapPres(TDewPoint)
+    return GetHumRatioFromVapPres(VapPres, Pressure)
+
+@_bulk
+def GetTDewPointFromHumRatio(TDryBulb, HumRatio, Pressure):
+    """
+    Array version of :func:`psychrometrics.GetTDewPointFromHumRatio`.
+
+    """
+    HumRatio = _invalid(HumRatio < 0, "Humidity ratio cannot be negative", HumRatio, 0.)
+
+    VapPres = GetVapPresFromHumRatio(HumRatio, Pressure)
+    return GetTDewPointFromVapPres(TDryBulb, VapPres)
+
+
+#######################################################################################################
+# Conversions between humidity ratio and vapor pressure
+#######################################################################################################
+
+@_bulk
+def GetHumRatioFromVapPres(VapPres, Pressure):
+    """
+    Array version of :func:`psychrometrics.GetHumRatioFromVapPres`.
+
+    """
+    VapPres = _invalid(VapPres < 0, "Partial pressure of water vapor in moist air cannot be negative", VapPres, 0.)
+
+    HumRatio = 0.621945 * VapPres / (Pressure - VapPres)
+
+    # Validity check.
+    return np.maximum(HumRatio, MIN_HUM_RATIO)
+
+@_bulk
+def GetVapPresFromHumRatio(HumRatio, Pressure):
+    """
+    Array version of :func:`psychrometrics.GetVapPresFromHumRatio`.
+
+    """
+    HumRatio = _invalid(HumRatio < 0, "Humidity ratio is negative", HumRatio, 0.)
+    BoundedHumRatio = np.maximum(HumRatio, MIN_HUM_RATIO)
+
+    return Pressure * BoundedHumRatio / (0.621945 + BoundedHumRatio)
+
+
+#######################################################################################################
+# Conversions between humidity ratio and specific humidity
+#######################################################################################################
+
+@_bulk
+def GetSpecificHumFromHumRatio(HumRatio):
+    """
+    Array version of :func:`psychrometrics.GetSpecificHumFromHumRatio`.
+
+    """
+    HumRatio = _invalid(HumRatio < 0, "Humidity ratio cannot be negative", HumRatio, 0.)
+    BoundedHumRatio = np.maximum(HumRatio, MIN_HUM_RATIO)
+
+    return BoundedHumRatio / (1.0 + BoundedHumRatio)
+
+@_bulk
+def GetHumRatioFromSpecificHum(SpecificHum):
+    """
+    Array version of :func:`psychrometrics.GetHumRatioFromSpecificHum`.
+
+    """
+    SpecificHum = _invalid((SpecificHum < 0.0) | (SpecificHum >= 1.0), "Specific humidity is outside range [0, 1)",
+                           SpecificHum, np.clip(SpecificHum, 0., np.nextafter(1., 0.)))
+
+    HumRatio = SpecificHum / (1.0 - SpecificHum)
+
+    # Validity check.
+    return np.maximum(HumRatio, MIN_HUM_RATIO)
+
+
+#######################################################################################################
+# Dry Air Calculations
+#######################################################################################################
+
+@_bulk
+def GetDryAirEnthalpy(TDryBulb):
+    """
+    Array version of :func:`psychrometrics.GetDryAirEnthalpy`.
+
+    """
+    if psy._ContextIsIP():
+        return 0.240 * TDryBulb
+    return 1006 * TDryBulb
+
+@_bulk
+def GetDryAirDensity(TDryBulb, Pressure):
+    """
+    Array version of :func:`psychrometrics.GetDryAirDensity`.
+
+    """
+    if psy._ContextIsIP():
+        return (144 * Pressure) / R_DA_IP / GetTRankineFromTFahrenheit(TDryBulb)
+    return Pressure / R_DA_SI / GetTKelvinFromTCelsius(TDryBulb)
+
+@_bulk
+def GetDryAirVolume(TDryBulb, Pressure):
+    """
+    Array version of :func:`psychrometrics.GetDryAirVolume`.
+
+    """
+    if psy._ContextIsIP():
+        return R_DA_IP * GetTRankineFromTFahrenheit(TDryBulb) / (144 * Pressure)
+    return R_DA_SI * GetTKelvinFromTCelsius(TDryBulb) / Pressure
+
+@_bulk
+def GetTDryBulbFromEnthalpyAndHumRatio(MoistAirEnthalpy, HumRatio):
+    """
+    Array version of :func:`psychrometrics.GetTDryBulbFromEnthalpyAndHumRatio`.
+
+    """
+    HumRatio = _invalid(HumRatio < 0, "Humidity ratio is negative", HumRatio, 0.)
+    BoundedHumRatio = np.maximum(HumRatio, MIN_HUM_RATIO)
+
+    if psy._ContextIsIP():
+        return (MoistAirEnthalpy - 1061.0 * BoundedHumRatio) / (0.240 + 0.444 * BoundedHumRatio)
+    return (MoistAirEnthalpy / 1000.0 - 2501.0 * BoundedHumRatio) / (1.006 + 1.86 * BoundedHumRatio)
+
+@_bulk
+def GetHumRatioFromEnthalpyAndTDryBulb(MoistAirEnthalpy, TDryBulb):
+    """
+    Array version of :func:`psychrometrics.GetHumRatioFromEnthalpyAndTDryBulb`.
+
+    """
+    if psy._ContextIsIP():
+        HumRatio = (MoistAirEnthalpy - 0.240 * TDryBulb) / (1061.0 + 0.444 * TDryBulb)
+    else:
+        HumRatio = (MoistAirEnthalpy / 1000.0 - 1.006 * TDryBulb) / (2501.0 + 1.86 * TDryBulb)
+
+    # Validity check.
+    return np.maximum(HumRatio, MIN_HUM_RATIO)
+
+
+#######################################################################################################
+# Saturated Air Calculations
+#######################################################################################################
+
+# Saturation vapor pressure can be computed exactly (the default) or looked up in a precomputed table.
+SAT_VAP_PRES_MODE = 'exact'
+
+SAT_VAP_PRES_TABLE_STEP_SI = 0.1
+"""float: Grid step of the saturation vapor pressure table in °C [SI].
+
+"""
+
+SAT_VAP_PRES_TABLE_STEP_IP = SAT_VAP_PRES_TABLE_STEP_SI * 9. / 5.
+"""float: Grid step of the saturation vapor pressure table in °F [IP].
+
+"""
+
+SAT_VAP_PRES_TABLE_MAX_REL_ERROR = 1e-12
+"""float: Maximum relative error of the tabulated saturation vapor pressure against the formulae.
+
+    Checked on a grid ten times finer than the table over the whole range of validity,
+    in both unit systems.
+
+"""
+
+_SAT_VAP_PRES_TABLES = {}
+
+def SetSatVapPresMode(Mode: str) -> None:
+    """
+    Choose how the functions of this module compute saturation vapor pressure.
+
+    Args:
+        Mode : 'exact' to evaluate the ASHRAE formulae (default), or 'table' to interpolate ln(Pws)
+               in a precomputed table
+
+    Notes:
+        In 'table' mode ln(Pws) is tabulated every 0.1°C (0.18°F) on nodes aligned with the triple point
+        of water, so that no interval straddles the change of formula. Values are
+        interpolated with cubic Hermite polynomials using the analytical derivative at the nodes,
+        which keeps the relative error under SAT_VAP_PRES_TABLE_MAX_REL_ERROR.
+        The solvers and every function built on `GetSatVapPres` use the table transparently.
+        The tables are built on first use for each unit system.
+
+    """
+    global SAT_VAP_PRES_MODE
+
+    if Mode not in ('exact', 'table'):
+        raise ValueError("The saturation vapor pressure mode has to be either 'exact' or 'table'.")
+
+    SAT_VAP_PRES_MODE = Mode
+
+def GetSatVapPresMode() -> str:
+    """
+    Return the saturation vapor pressure mode in use ('exact' or 'table').
+
+    """
+    return SAT_VAP_PRES_MODE
+
+def _LnPwsFormula(T, ip, ice):
+    """
+    ASHRAE formula for ln(Pws) over ice or over liquid water, given absolute temperature in °R [IP] or K [SI].
+
+    """
+    if ip:
+        if ice:
+            return (-1.0214165E+04 / T - 4.8932428 - 5.3765794E-03 * T + 1.9202377E-07 * T**2
+                    + 3.5575832E-10 * T**3 - 9.0344688E-14 * T**4 + 4.1635019 * np.log(T))
+        return (-1.0440397E+04 / T - 1.1294650E+01 - 2.7022355E-02 * T + 1.2890360E-05 * T**2
+                - 2.4780681E-09 * T**3 + 6.5459673 * np.log(T))
+    if ice:
+        return (-5.6745359E+03 / T + 6.3925247 - 9.677843E-03 * T + 6.2215701E-07 * T**2
+                + 2.0747825E-09 * T**3 - 9.484024E-13 * T**4 + 4.1635019 * np.log(T))
+    return (-5.8002206E+03 / T + 1.3914993 - 4.8640239E-02 * T + 4.1764768E-05 * T**2
+            - 1.4452093E-08 * T**3 + 6.5459673 * np.log(T))
+
+def _dLnPwsFormula(T, ip, ice):
+    """
+    Derivative of `_LnPwsFormula` with respect to temperature.
+
+    """
+    if ip:
+        if ice:
+            return (1.0214165E+04 / T**2 - 5.3765794E-03 + 2 * 1.9202377E-07 * T
+                    + 3 * 3.5575832E-10 * T**2 - 4 * 9.0344688E-14 * T**3 + 4.1635019 / T)
+        return (1.0440397E+04 / T**2 - 2.7022355E-02 + 2 * 1.2890360E-05 * T
+                - 3 * 2.4780681E-09 * T**2 + 6.5459673 / T)
+    if ice:
+        return (5.6745359E+03 / T**2 - 9.677843E-03 + 2 * 6.2215701E-07 * T
+                + 3 * 2.0747825E-09 * T**2 - 4 * 9.484024E-13 * T**3 + 4.1635019 / T)
+    return (5.8002206E+03 / T**2 - 4.8640239E-02 + 2 * 4.1764768E-05 * T
+            - 3 * 1.4452093E-08 * T**2 + 6.5459673 / T)
+
+def _SatVapPresTable(ip):
+    """
+    Build (once) and return the ln(Pws) table of a unit system.
+
+    The nodes are aligned on the triple point, so every interval lies entirely on the ice or on the water
+    side. Each interval stores the coefficients of its cubic Hermite polynomial in the local coordinate
+    s in [0, 1], which leaves four lookups and a Horner evaluation per value.
+
+    Returns:
+        Tuple of (first node, step, (c0, c1, c2, c3)) with one coefficient per interval in each array
+
+    """
+    if ip in _SAT_VAP_PRES_TABLES:
+        return _SAT_VAP_PRES_TABLES[ip]
+
+    if ip:
+        bounds, triple_point, step, zero = (-148., 392.), TRIPLE_POINT_WATER_IP, SAT_VAP_PRES_TABLE_STEP_IP, ZERO_FAHRENHEIT_AS_RANKINE
+    else:
+        bounds, triple_point, step, zero = (-100., 200.), TRIPLE_POINT_WATER_SI, SAT_VAP_PRES_TABLE_STEP_SI, ZERO_CELSIUS_AS_KELVIN
+
+    n_ice = int(np.ceil((triple_point - bounds[0]) / step))
+    n_water = int(np.ceil((bounds[1] - triple_point) / step))
+    nodes = triple_point + step * np.arange(-n_ice, n_water + 1) + zero
+
+    coefficients = []
+    for T0, T1, ice in [(nodes[:n_ice], nodes[1:n_ice + 1], True), (nodes[n_ice:-1], nodes[n_ice + 1:], False)]:
+        y0, y1 = _LnPwsFormula(T0, ip, ice), _LnPwsFormula(T1, ip, ice)
+        m0, m1 = step * _dLnPwsFormula(T0, ip, ice), step * _dLnPwsFormula(T1, ip, ice)
+        coefficients.append(np.column_stack([y0, m0, 3 * (y1 - y0) - 2 * m0 - m1, 2 * (y0 - y1) + m0 + m1]))
+
+    table = (nodes[0] - zero, step, tuple(np.concatenate(coefficients).T.copy()))
+    _SAT_VAP_PRES_TABLES[ip] = table
+    return table
+
+def _LnPwsTable(TDryBulb, ip):
+    """
+    ln(Pws) interpolated in the table with cubic Hermite polynomials.
+
+    """
+    low, step, (c0, c1, c2, c3) = _SatVapPresTable(ip)
+    position = (TDryBulb - low) / step
+    i = np.clip(np.floor(np.nan_to_num(position)).astype(np.intp), 0, len(c0) - 1)
+    s = position - i
+    return c0[i] + s * (c1[i] + s * (c2[i] + s * c3[i]))
+
+def _LnPws(TDryBulb):
+    """
+    ln(Pws) from the formulae or the tables, depending on SAT_VAP_PRES_MODE.
+
+    """
+    ip = psy._ContextIsIP()
+    if SAT_VAP_PRES_MODE == 'table':
+        return _LnPwsTable(TDryBulb, ip)
+
+    T = TDryBulb + (ZERO_FAHRENHEIT_AS_RANKINE if ip else ZERO_CELSIUS_AS_KELVIN)
+    triple_point = TRIPLE_POINT_WATER_IP if ip else TRIPLE_POINT_WATER_SI
+    return np.where(TDryBulb <= triple_point, _LnPwsFormula(T, ip, True), _LnPwsFormula(T, ip, False))
+
+@_bulk
+def GetSatVapPres(TDryBulb):
+    """
+    Array version of :func:`psychrometrics.GetSatVapPres`.
+
+    Notes:
+        Interpolates in a precomputed table instead of evaluating the formulae after
+        `SetSatVapPresMode('table')`.
+
+    """
+    if psy._ContextIsIP():
+        TDryBulb = _invalid((TDryBulb < -148) | (TDryBulb > 392), "Dry bulb temperature must be in range [-148, 392]°F",
+                            TDryBulb, np.clip(TDryBulb, -148, 392))
+    else:
+        TDryBulb = _invalid((TDryBulb < -100) | (TDryBulb > 200), "Dry bulb temperature must be in range [-100, 200]°C",
+                            TDryBulb, np.clip(TDryBulb, -100, 200))
+
+    return np.exp(_LnPws(TDryBulb))
+
+@_bulk
+def GetSatHumRatio(TDryBulb, Pressure):
+    """
+    Array version of :func:`psychrometrics.GetSatHumRatio`.
+
+    """
+    SatVaporPres = GetSatVapPres(TDryBulb)
+    SatHumRatio = 0.621945 * SatVaporPres / (Pressure - SatVaporPres)
+
+    # Validity check.
+    return np.maximum(SatHumRatio, MIN_HUM_RATIO)
+
+@_bulk
+def GetSatAirEnthalpy(TDryBulb, Pressure):
+    """
+    Array version of :func:`psychrometrics.GetSatAirEnthalpy`.
+
+    """
+    SatHumRatio = GetSatHumRatio(TDryBulb, Pressure)
+    return GetMoistAirEnthalpy(TDryBulb, SatHumRatio)
+
+
+#######################################################################################################
+# Moist Air Calculations
+#######################################################################################################
+
+@_bulk
+def GetVaporPressureDeficit(TDryBulb, HumRatio, Pressure):
+    """
+    Array version of :func:`psychrometrics.GetVaporPressureDeficit`.
+
+    """
+    HumRatio = _invalid(HumRatio < 0, "Humidity ratio is negative", HumRatio, 0.)
+
+    RelHum = GetRelHumFromHumRatio(TDryBulb, HumRatio, Pressure)
+    return GetSatVapPres(TDryBulb) * (1 - RelHum)
+
+@_bulk
+def GetDegreeOfSaturation(TDryBulb, HumRatio, Pressure):
+    """
+    Array version of :func:`psychrometrics.GetDegreeOfSaturation`.
+
+    """
+    HumRatio = _invalid(HumRatio < 0, "Humidity ratio is negative", HumRatio, 0.)
+    BoundedHumRatio = np.maximum(HumRatio, MIN_HUM_RATIO)
+
+    return BoundedHumRatio / GetSatHumRatio(TDryBulb, Pressure)
+
+@_bulk
+def GetMoistAirEnthalpy(TDryBulb, HumRatio):
+    """
+    Array version of :func:`psychrometrics.GetMoistAirEnthalpy`.
+
+    """
+    HumRatio = _invalid(HumRatio < 0, "Humidity ratio is negative", HumRatio, 0.)
+    BoundedHumRatio = np.maximum(HumRatio, MIN_HUM_RATIO)
+
+    if psy._ContextIsIP():
+        return 0.240 * TDryBulb + BoundedHumRatio * (1061 + 0.444 * TDryBulb)
+    return (1.006 * TDryBulb + BoundedHumRatio * (2501. + 1.86 * TDryBulb)) * 1000
+
+@_bulk
+def GetMoistAirVolume(TDryBulb, HumRatio, Pressure):
+    """
+    Array version of :func:`psychrometrics.GetMoistAirVolume`.
+
+    """
+    HumRatio = _invalid(HumRatio < 0, "Humidity ratio is negative", HumRatio, 0.)
+    BoundedHumRatio = np.maximum(HumRatio, MIN_HUM_RATIO)
+
+    if psy._ContextIsIP():
+        return R_DA_IP * GetTRankineFromTFahrenheit(TDryBulb) * (1 + 1.607858 * BoundedHumRatio) / (144 * Pressure)
+    return R_DA_SI * GetTKelvinFromTCelsius(TDryBulb) * (1 + 1.607858 * BoundedHumRatio) / Pressure
+
+@_bulk
+def GetTDryBulbFromMoistAirVolumeAndHumRatio(MoistAirVolume, HumRatio, Pressure):
+    """
+    Array version of :func:`psychrometrics.GetTDryBulbFromMoistAirVolumeAndHumRatio`.
+
+    """
+    HumRatio = _invalid(HumRatio < 0, "Humidity ratio is negative", HumRatio, 0.)
+    BoundedHumRatio = np.maximum(HumRatio, MIN_HUM_RATIO)
+
+    if psy._ContextIsIP():
+        return GetTFahrenheitFromTRankine(MoistAirVolume * (144 * Pressure)
+                        / (R_DA_IP * (1 + 1.607858 * BoundedHumRatio)))
+    return GetTCelsiusFromTKelvin(MoistAirVolume * Pressure
+                        / (R_DA_SI * (1 + 1.607858 * BoundedHumRatio)))
+
+@_bulk
+def GetMoistAirDensity(TDryBulb, HumRatio, Pressure):
+    """
+    Array version of :func:`psychrometrics.GetMoistAirDensity`.
+
+    """
+    HumRatio = _invalid(HumRatio < 0, "Humidity ratio is negative", HumRatio, 0.)
+    BoundedHumRatio = np.maximum(HumRatio, MIN_HUM_RATIO)
+
+    MoistAirVolume = GetMoistAirVolume(TDryBulb, BoundedHumRatio, Pressure)
+    return (1 + BoundedHumRatio) / MoistAirVolume
+
+
+#######################################################################################################
+# Standard atmosphere
+#######################################################################################################
+
+@_bulk
+def GetStandardAtmPressure(Altitude):
+    """
+    Array version of :func:`psychrometrics.GetStandardAtmPressure`.
+
+    """
+    if psy._ContextIsIP():
+        return 14.696 * np.power(1 - 6.8754e-06 * Altitude, 5.2559)
+    return 101325 * np.power(1 - 2.25577e-05 * Altitude, 5.2559)
+
+@_bulk
+def GetStandardAtmTemperature(Altitude):
+    """
+    Array version of :func:`psychrometrics.GetStandardAtmTemperature`.
+
+    """
+    if psy._ContextIsIP():
+        return 59 - 0.00356620 * Altitude
+    return 15 - 0.0065 * Altitude
+
+@_bulk
+def GetSeaLevelPressure(StationPressure, Altitude, TDryBulb):
+    """
+    Array version of :func:`psychrometrics.GetSeaLevelPressure`.
+
+    """
+    if psy._ContextIsIP():
+        # Calculate average temperature in column of air, assuming a lapse rate
+        # of 3.6 °F/1000ft
+        TColumn = TDryBulb + 0.0036 * Altitude / 2
+
+        # Determine the scale height
+        H = 53.351 * GetTRankineFromTFahrenheit(TColumn)
+    else:
+        # Calculate average temperature in column of air, assuming a lapse rate
+        # of 6.5 °C/km
+        TColumn = TDryBulb + 0.0065 * Altitude / 2
+
+        # Determine the scale height
+        H = 287.055 * GetTKelvinFromTCelsius(TColumn) / 9.807
+
+    return StationPressure * np.exp(Altitude / H)
+
+@_bulk
+def GetStationPressure(SeaLevelPressure, Altitude, TDryBulb):
+    """
+    Array version of :func:`psychrometrics.GetStationPressure`.
+
+    """
+    return SeaLevelPressure / GetSeaLevelPressure(np.ones_like(SeaLevelPressure), Altitude, TDryBulb)
+
+
+######################################################################################################
+# Functions to set all psychrometric values
+#######################################################################################################
+
+@_bulk
+def CalcPsychrometricsFromTWetBulb(TDryBulb, TWetBulb, Pressure):
+    """
+    Array version of :func:`psychrometrics.CalcPsychrometricsFromTWetBulb`.
+
+    Returns:
+        Tuple of HumRatio, TDewPoint, RelHum, VapPres, MoistAirEnthalpy, MoistAirVolume, DegreeOfSaturation
+
+    """
+    HumRatio = GetHumRatioFromTWetBulb(TDryBulb, TWetBulb, Pressure)
+    TDewPoint = GetTDewPointFromHumRatio(TDryBulb, HumRatio, Pressure)
+    RelHum = GetRelHumFromHumRatio(TDryBulb, HumRatio, Pressure)
+    VapPres = GetVapPresFromHumRatio(HumRatio, Pressure)
+    MoistAirEnthalpy = GetMoistAirEnthalpy(TDryBulb, HumRatio)
+    MoistAirVolume = GetMoistAirVolume(TDryBulb, HumRatio, Pressure)
+    DegreeOfSaturation = GetDegreeOfSaturation(TDryBulb, HumRatio, Pressure)
+    return HumRatio, TDewPoint, RelHum, VapPres, MoistAirEnthalpy, MoistAirVolume, DegreeOfSaturation
+
+@_bulk
+def CalcPsychrometricsFromTDewPoint(TDryBulb, TDewPoint, Pressure):
+    """
+    Array version of :func:`psychrometrics.CalcPsychrometricsFromTDewPoint`.
+
+    Returns:
+        Tuple of HumRatio, TWetBulb, RelHum, VapPres, MoistAirEnthalpy, MoistAirVolume, DegreeOfSaturation
+
+    """
+    HumRatio = GetHumRatioFromTDewPoint(TDewPoint, Pressure)
+    TWetBulb = GetTWetBulbFromHumRatio(TDryBulb, HumRatio, Pressure)
+    RelHum = GetRelHumFromHumRatio(TDryBulb, HumRatio, Pressure)
+    VapPres = GetVapPresFromHumRatio(HumRatio, Pressure)
+    MoistAirEnthalpy = GetMoistAirEnthalpy(TDryBulb, HumRatio)
+    MoistAirVolume = GetMoistAirVolume(TDryBulb, HumRatio, Pressure)
+    DegreeOfSaturation = GetDegreeOfSaturation(TDryBulb, HumRatio, Pressure)
+    return HumRatio, TWetBulb, RelHum, VapPres, MoistAirEnthalpy, MoistAirVolume, DegreeOfSaturation
+
+@_bulk
+def CalcPsychrometricsFromRelHum(TDryBulb, RelHum, Pressure):
+    """
+    Array version of :func:`psychrometrics.CalcPsychrometricsFromRelHum`.
+
+    Returns:
+        Tuple of HumRatio, TWetBulb, TDewPoint, VapPres, MoistAirEnthalpy, MoistAirVolume, DegreeOfSaturation
+
+    """
+    HumRatio = GetHumRatioFromRelHum(TDryBulb, RelHum, Pressure)
+    TWetBulb = GetTWetBulbFromHumRatio(TDryBulb, HumRatio, Pressure)
+    TDewPoint = GetTDewPointFromHumRatio(TDryBulb, HumRatio, Pressure)
+    VapPres = GetVapPresFromHumRatio(HumRatio, Pressure)
+    MoistAirEnthalpy = GetMoistAirEnthalpy(TDryBulb, HumRatio)
+    MoistAirVolume = GetMoistAirVolume(TDryBulb, HumRatio, Pressure)
+    DegreeOfSaturation = GetDegreeOfSaturation(TDryBulb, HumRatio, Pressure)
+    return HumRatio, TWetBulb, TDewPoint, VapPres, MoistAirEnthalpy, MoistAirVolume, DegreeOfSaturation
+
+
+#######################################################################################################
+# Cache of psychrometric states
+#######################################################################################################
+
+class PsychrometricsCache:
+    """
+    Bounded LRU cache in front of the `CalcPsychrometricsFrom*` functions, keyed on quantized inputs.
+
+    Weather and BMS data report temperature and humidity at a coarse resolution, so the same states
+    come back over and over across sites and years. The inputs are rounded to `resolution`, the
+    distinct states of a call are computed at once (only those not cached yet), and every row gets the
+    properties of its state. Lookups are vectorized (hash index of the quantized states), so a warm
+    cache is faster than computing. States are kept across calls until `maxsize` is reached, after
+    which those used in the oldest calls are dropped.
+
+    Args:
+        resolution : Quantization step per argument name, merged with DEFAULT_RESOLUTION. The values
+                     returned are those of the rounded state
+        maxsize : Maximum number of states kept
+
+    Attributes:
+        hits : Number of rows served from the cache, or from another row of the same call
+        misses : Number of states computed
+
+    Example:
+        >>> cache = PsychrometricsCache()
+        >>> for site in sites:
+        ...     values = cache.CalcPsychrometricsFromRelHum(site['T2M'], site['RH2M'] / 100, 101325.)
+        >>> cache.hits, cache.misses
+
+    """
+    DEFAULT_RESOLUTION = {'TDryBulb': 0.001, 'TWetBulb': 0.001, 'TDewPoint': 0.001, 'RelHum': 1e-5, 'Pressure': 0.1}
+
+    def __init__(self, resolution: dict = None, maxsize: int = 1_000_000):
+        self.resolution = {**self.DEFAULT_RESOLUTION, **(resolution or {})}
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._states = {}
+        self._calls = 0
+
+    def __len__(self):
+        return sum(len(store['values']) for store in self._states.values())
+
+    def clear(self):
+        """
+        Drop every state and reset the counters.
+
+        """
+        self._states.clear()
+        self.hits = self.misses = 0
+
+    def CalcPsychrometricsFromTWetBulb(self, TDryBulb, TWetBulb, Pressure, **kwargs):
+        """
+        Cached :func:`CalcPsychrometricsFromTWetBulb`.
+
+        """
+        return self._cached(CalcPsychrometricsFromTWetBulb, ('TDryBulb', 'TWetBulb', 'Pressure'),
+                            (TDryBulb, TWetBulb, Pressure), kwargs)
+
+    def CalcPsychrometricsFromTDewPoint(self, TDryBulb, TDewPoint, Pressure, **kwargs):
+        """
+        Cached :func:`CalcPsychrometricsFromTDewPoint`.
+
+        """
+        return self._cached(CalcPsychrometricsFromTDewPoint, ('TDryBulb', 'TDewPoint', 'Pressure'),
+                            (TDryBulb, TDewPoint, Pressure), kwargs)
+
+    def CalcPsychrometricsFromRelHum(self, TDryBulb, RelHum, Pressure, **kwargs):
+        """
+        Cached :func:`CalcPsychrometricsFromRelHum`.
+
+        """
+        return self._cached(CalcPsychrometricsFromRelHum, ('TDryBulb', 'RelHum', 'Pressure'),
+                            (TDryBulb, RelHum, Pressure), kwargs)
+
+    def _cached(self, func, names, args, kwargs):
+        index = next((arg.index for arg in args if isinstance(arg, pd.Series)), None)
+        arrays = [np.asarray(arg, dtype=float) for arg in args]
+        shape = np.broadcast_shapes(*(array.shape for array in arrays))
+        arrays = [np.broadcast_to(array, shape).ravel() for array in arrays]
+        steps = np.array([self.resolution[name] for name in names])
+
+        # Rows with a missing input are left out and come back as NaN
+        valid = np.logical_and.reduce([np.isfinite(array) for array in arrays])
+        keys = [np.rint(array[valid] / step).astype(np.int64) for array, step in zip(arrays, steps)]
+
+        # Number the distinct states of this call, one column at a time to stay within int64
+        codes = np.zeros(len(keys[0]), dtype=np.int64)
+        for key in keys:
+            column_codes, uniques = pd.factorize(key)
+            codes = pd.factorize(codes * len(uniques) + column_codes)[0]
+        n_states = codes.max() + 1 if len(codes) else 0
+        first = np.empty(n_states, dtype=np.int64)
+        first[codes[::-1]] = np.arange(len(codes))[::-1]
+        states = pd.MultiIndex.from_arrays([key[first] for key in keys])
+
+        # One store per function, unit system, saturation vapor pressure mode and keyword arguments
+        store = self._states.setdefault(
+            (func.__name__, psy._ContextUnitSystem(), SAT_VAP_PRES_MODE, tuple(sorted(kwargs.items()))),
+            {'states': states[:0], 'values': np.empty((0, 7)), 'used': np.empty(0, dtype=np.int64)})
+        self._calls += 1
+
+        positions = store['states'].get_indexer(states)
+        missing = np.flatnonzero(positions < 0)
+        store['used'][positions[positions >= 0]] = self._calls
+        if len(missing):
+            inputs = np.column_stack([key[first[missing]] for key in keys]) * steps
+            values = np.column_stack(func(*inputs.T, **kwargs))
+            positions[missing] = np.arange(len(store['values']), len(store['values']) + len(missing))
+            store['states'] = store['states'].append(states[missing])
+            store['values'] = np.concatenate([store['values'], values])
+            store['used'] = np.concatenate([store['used'], np.full(len(missing), self._calls)])
+
+        result = np.full((len(valid), 7), np.nan)
+        result[valid] = store['values'][positions][codes]
+
+        self.misses += len(missing)
+        self.hits += len(codes) - len(missing)
+        self._evict()
+
+        outputs = [column.reshape(shape) for column in result.T]
+        if index is not None:
+            outputs = [pd.Series(output, index=index) for output in outputs]
+        elif not shape:
+            outputs = [output.item() for output in outputs]
+        return tuple(outputs)
+
+    def _evict(self):
+        """
+        Drop the least recently used states until at most `maxsize` are left.
+
+        """
+        excess = len(self) - self.maxsize
+        if excess <= 0:
+            return
+        stores = list(self._states.values())
+        used = np.concatenate([store['used'] for store in stores])
+        # Oldest first; within a call, the states added first go first
+        keep = np.ones(len(used), dtype=bool)
+        keep[np.argsort(used, kind='stable')[:excess]] = False
+        for store, store_keep in zip(stores, np.split(keep, np.cumsum([len(store['used']) for store in stores])[:-1])):
+            store['states'], store['values'], store['used'] = (store['states'][store_keep], store['values'][store_keep],
+                                                               store['used'][store_keep])
+
+
+#######################################################################################################
+# Chunked evaluation on several cores
+#######################################################################################################
+
+# Shared memory blocks of the worker process, attached once by _InitChunkWorker
+_WORKER_BLOCKS = {}
+
+def _InitChunkWorker(Units, Mode, blocks):
+    """
+    Set up a worker process of :func:`CalcInChunks`: unit system, saturation vapor pressure mode,
+    and the shared memory blocks holding the input and output slots.
+
+    """
+    psy.SetUnitSystem(Units)
+    SetSatVapPresMode(Mode)
+    _WORKER_BLOCKS.clear()
+    for key, (name, shape, dtype) in blocks.items():
+        block = shared_memory.SharedMemory(name=name)
+        _WORKER_BLOCKS[key] = (block, np.ndarray(shape, dtype=dtype, buffer=block.buf))
+
+def _RunChunk(func, slot, length, constants, kwargs):
+    """
+    Evaluate `func` on the input slot `slot` of the shared memory and write the outputs to the same slot.
+
+    """
+    inputs = iter(_WORKER_BLOCKS['inputs'][1][slot, :, :length])
+    args = [next(inputs) if constant is None else constant for constant in constants]
+    result = func(*args, **kwargs)
+    for key, value in enumerate(result if isinstance(result, tuple) else (result,)):
+        _WORKER_BLOCKS[key][1][slot, :length] = value
+
+def CalcInChunks(func, *args, chunk_size=1_000_000, workers=None, out=None, **kwargs):
+    """
+    Evaluate a function of this module on row blocks dispatched to a pool of processes.
+
+    Meant for inputs too large to process in one go, e.g. tens of millions of 1-minute samples.
+    The rows are cut into blocks of `chunk_size`, which the workers read from and write to through
+    shared memory. As blocks complete, their results are copied into the output arrays and their
+    shared memory slot is reused for the next block. Memory is thus bounded by the inputs and outputs
+    themselves plus two blocks in flight per worker, whatever the number of rows.
+
+    Args:
+        func : Function of this module, e.g. `CalcPsychrometricsFromRelHum`
+        *args : Arguments of `func`. Arrays (or Series) are cut into blocks, scalars are passed as is
+        chunk_size : Number of rows per block
+        workers : Number of worker processes. Defaults to the number of cores. With 1, the blocks are
+                  evaluated one after the other in this process
+        out : Preallocated output array, or tuple of arrays if `func` returns a tuple, to write into
+        **kwargs : Keyword arguments of `func`, e.g. `errors='nan'`
+
+    Returns:
+        The same as `func(*args, **kwargs)`, as arrays (or Series if a Series was passed), or `out`
+
+    Notes:
+        The unit system and the saturation vapor pressure mode of the caller are used in the workers.
+        Arrays are broadcast against each other and flattened; the outputs are reshaped to match.
+
+    Example:
+        >>> values = CalcInChunks(CalcPsychrometricsFromRelHum, df['OAT'], df['RH'] / 100, 101325.,
+        ...                       chunk_size=500_000, workers=8)
+
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunk_size < 1 or workers < 1:
+        raise ValueError("chunk_size and workers must be at least 1")
+
+    index = next((arg.index for arg in args if isinstance(arg, pd.Series)), None)
+    arrays = [np.asarray(arg, dtype=float) for arg in args]
+    shape = np.broadcast_shapes(*(array.shape for array in arrays))
+    n = int(np.prod(shape))
+    # None marks the arguments cut into blocks, scalars are passed to every block
+    constants = [None if array.ndim else array.item() for array in arrays]
+    arrays = [np.broadcast_to(array, shape).ravel() for array in arrays if array.ndim]
+
+    def block(start, stop):
+        inputs = iter(array[start:stop] for array in arrays)
+        return [next(inputs) if constant is None else constant for constant in constants]
+
+    # Evaluate the first rows here to learn the number and types of the outputs
+    probe = func(*block(0, min(n, 2)), **kwargs)
+    tuple_result = isinstance(probe, tuple)
+    probe = probe if tuple_result else (probe,)
+
+    if out is None:
+        outputs = [np.empty(n, dtype=np.asarray(value).dtype) for value in probe]
+    else:
+        outputs = list(out) if tuple_result else [out]
+    flat_outputs = [output.reshape(-1) for output in outputs]
+    if any(not np.shares_memory(flat, output) for flat, output in zip(flat_outputs, outputs)):
+        raise ValueError("out must hold contiguous arrays")
+
+    chunks = ((start, min(start + chunk_size, n)) for start in range(0, n, chunk_size))
+
+    if workers == 1:
+        for start, stop in chunks:
+            result = func(*block(start, stop), **kwargs)
+            for flat, value in zip(flat_outputs, result if tuple_result else (result,)):
+                flat[start:stop] = value
+    else:
+        slots = 2 * workers
+        specs = {'inputs': ((slots, len(arrays), chunk_size), np.dtype(float))}
+        specs.update({key: ((slots, chunk_size), flat.dtype) for key, flat in enumerate(flat_outputs)})
+        blocks = {key: shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape_)) * dtype.itemsize, 1))
+                  for key, (shape_, dtype) in specs.items()}
+        views = {}
+        try:
+            views = {key: np.ndarray(specs[key][0], dtype=specs[key][1], buffer=block_.buf)
+                     for key, block_ in blocks.items()}
+            initargs = (psy._ContextUnitSystem(), SAT_VAP_PRES_MODE,
+                        {key: (block_.name, *specs[key]) for key, block_ in blocks.items()})
+
+            with ProcessPoolExecutor(workers, initializer=_InitChunkWorker, initargs=initargs) as pool:
+                free, pending = list(range(slots)), {}
+                while True:
+                    # Keep every slot busy, then collect whatever completes first
+                    for slot in list(free):
+                        chunk = next(chunks, None)
+                        if chunk is None:
+                            break
+                        start, stop = chunk
+                        free.remove(slot)
+                        for position, array in enumerate(arrays):
+                            views['inputs'][slot, position, :stop - start] = array[start:stop]
+                        future = pool.submit(_RunChunk, func, slot, stop - start, constants, kwargs)
+                        pending[future] = (slot, start, stop)
+                    if not pending:
+                        break
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        slot, start, stop = pending.pop(future)
+                        future.result()
+                        for key, flat in enumerate(flat_outputs):
+                            flat[start:stop] = views[key][slot, :stop - start]
+                        free.append(slot)
+        finally:
+            # The views have to go before the blocks can be closed
+            views.clear()
+            for block_ in blocks.values():
+                block_.close()
+                block_.unlink()
+
+    if out is not None:
+        return out
+    outputs = [output.reshape(shape) for output in outputs]
+    if index is not None:
+        outputs = [pd.Series(output, index=index) for output in outputs]
+    return tuple(outputs) if tuple_result else outputs[0]
+
+
+UnitSystemContext = psy._UnitSystemContext
+"""Use a system of units (SI or IP) inside a `with` block, for the current thread or task only.
+
+The functions of this module follow it. Those of `psychrometrics` only do without Numba: once compiled, they and
+`psychrometrics.GetUnitSystem` stay on the global unit system.
+
+"""
+
+si = psy.UnitNamespace(sys.modules[__name__], psy.SI)
+"""UnitNamespace: Functions of this module in SI units.
+
+"""
+
+ip = psy.UnitNamespace(sys.modules[__name__], psy.IP)
+"""UnitNamespace: Functions of this module in IP units.
+
+"""
+
+
+#######################################################################################################
+# pandas accessor
+#######################################################################################################
+
+@pd.api.extensions.register_dataframe_accessor('psychro')
+class PsychrometricsAccessor:
+    """
+    Psychrometric properties of the columns of a DataFrame, available as ``df.psychro``.
+
+    The accessor is registered when this module is imported.
+
+    Example
+        >>> from otters.wrangle import psychrometrics, psychrometrics_vec
+        >>> psychrometrics.SetUnitSystem(psychrometrics.SI)
+        >>> df = df.psychro.from_relhum(tdb='OAT', rh='RH', pressure=101325.)
+
+    """
+    OUTPUTS = ('HumRatio', 'TWetBulb', 'TDewPoint', 'VapPres', 'MoistAirEnthalpy', 'MoistAirVolume',
+               'DegreeOfSaturation')
+
+    def __init__(self, pandas_obj):
+        self._obj = pandas_obj
+
+    def _column(self, value):
+        """
+        Float array of a column given by name, or the value itself (e.g. a constant pressure).
+
+        """
+        if isinstance(value, str):
+            return self._obj[value].to_numpy(dtype=float)
+        return np.asarray(value, dtype=float)
+
+    def from_relhum(self, tdb: str, rh: str, pressure, prefix: str = '', inplace: bool = False,
+                    time_series: bool = False, errors: str = 'raise'):
+        """
+        Append the outputs of :func:`CalcPsychrometricsFromRelHum` as columns, computed in one pass.
+
+        The saturation vapor pressure and the humidity ratio are computed once and shared by all the
+        properties, and the dew point found on the way is reused to bracket the wet bulb.
+
+        Args:
+            tdb : Name of the dry-bulb temperature column, in °F [IP] or °C [SI]
+            rh : Name of the relative humidity column, in [0, 1]
+            pressure : Name of the atmospheric pressure column, or a constant pressure, in Psi [IP] or Pa [SI]
+            prefix : Prefix of the new column names
+            inplace : Add the columns to this DataFrame instead of a copy
+            time_series : The rows are ordered samples of a trend: warm-start the dew-point and wet-bulb
+                          solvers from nearby rows (see :func:`GetTWetBulbFromHumRatio`), from
+                          WARM_START_MIN_SIZE rows on
+            errors : What to do with out-of-range inputs, one of ERROR_POLICIES (see the module docstring)
+
+        Returns:
+            The DataFrame with the columns HumRatio, TWetBulb, TDewPoint, VapPres, MoistAirEnthalpy,
+            MoistAirVolume and DegreeOfSaturation added (prefixed), or None if `inplace`
+
+        """
+        if errors not in ERROR_POLICIES:
+            raise ValueError(f"errors must be one of {ERROR_POLICIES}")
+
+        token = _ERRORS.set(errors)
+        try:
+            TDryBulb = self._column(tdb)
+            RelHum = self._column(rh)
+            Pressure = self._column(pressure)
+
+            RelHum = _invalid((RelHum < 0) | (RelHum > 1), "Relative humidity is outside range [0, 1]",
+                              RelHum, np.clip(RelHum, 0, 1))
+
+            SatVapPres = GetSatVapPres(TDryBulb)
+            HumRatio = GetHumRatioFromVapPres(RelHum * SatVapPres, Pressure)
+            VapPres = GetVapPresFromHumRatio(HumRatio, Pressure)
+            TDewPoint = GetTDewPointFromVapPres(TDryBulb, VapPres, time_series=time_series)
+            TWetBulb = GetTWetBulbFromHumRatio(TDryBulb, HumRatio, Pressure, TDewPoint=TDewPoint,
+                                               time_series=time_series)
+            MoistAirEnthalpy = GetMoistAirEnthalpy(TDryBulb, HumRatio)
+            MoistAirVolume = GetMoistAirVolume(TDryBulb, HumRatio, Pressure)
+            SatHumRatio = np.maximum(0.621945 * SatVapPres / (Pressure - SatVapPres), MIN_HUM_RATIO)
+            DegreeOfSaturation = HumRatio / SatHumRatio
+        finally:
+            _ERRORS.reset(token)
+
+        values = (HumRatio, TWetBulb, TDewPoint, VapPres, MoistAirEnthalpy, MoistAirVolume, DegreeOfSaturation)
+        columns = {prefix + name: np.broadcast_to(value, TDryBulb.shape)
+                   for name, value in zip(self.OUTPUTS, values)}
+
+        if inplace:
+            for name, value in columns.items():
+                self._obj[name] = value
+            return None
+        return self._obj.assign(**columns)
@@ -1,14 +1,98 @@
 import pandas as pd
-import gc
+import numpy as np
+import re
+import warnings
 from math import ceil
 from datetime import datetime, timedelta, date, time
 from dateutil.relativedelta import relativedelta, MO
 
-def str2dt(df, timeCol='', drop=True, index_name="Timestamp", **datetime_args):
+TIMESTAMP_NAMES = ['timestamp', 'Date/Time', 'Date', 'Time', "Date and time", "Date & time"]
+
+# Parsing arguments found by inferTimeFormat, per source given to str2dt/combineDateTime
+_time_formats = {}
+
+def inferTimeFormat(s, dayfirst=None, sample_size=1000):
+    """
+    Work out once how a column of timestamps should be parsed so that pd.to_datetime doesn't have to guess for
+    every element.
+
+    Numbers are read as epochs with the unit given by their magnitude. Strings get the format guessed from the first
+    value, checked against a sample of the column. ISO 8601 strings use pandas' ISO fast path.
+
+    :param s: Column of timestamps
+    :type s: Series, required
+
+    :param dayfirst: Prefer day first when a date is ambiguous. None tries month first, then day first
+    :type dayfirst: bool, default None
+
+    :param sample_size: Number of values the guessed format has to parse
+    :type sample_size: int, default 1000
+
+    :return: dict of arguments for pd.to_datetime, empty when nothing better than pandas' own inference was found
+    """
+    sample = s.dropna().iloc[:sample_size]
+    if sample.empty or pd.api.types.is_datetime64_any_dtype(sample):
+        return {}
+
+    if pd.api.types.is_numeric_dtype(sample):
+        magnitude = sample.abs().median()
+        for unit, limit in [('s', 1e11), ('ms', 1e14), ('us', 1e17), ('ns', np.inf)]:
+            if 1e8 <= magnitude < limit:
+                return {'unit': unit}
+        return {}
+
+    sample = sample.astype(str)
+    for first in ([False, True] if dayfirst is None else [dayfirst]):
+        # The guess is checked against the sample below, pandas' warning about the day order doesn't apply
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)
+            format = pd.tseries.api.guess_datetime_format(sample.iloc[0], dayfirst=first)
+        if format is None:
+            continue
+        if format.startswith('%Y-%m-%d'):
+            format = 'ISO8601'
+        if _formatFits(sample, format):
+            return {'format': format}
+    return {}
+
+def _formatFits(sample, format):
+    """Whether every value of the sample parses with the format."""
+    try:
+        pd.to_datetime(sample, format=format)
+    except (ValueError, TypeError):
+        return False
+    return True
+
+def _parseTimestamps(s, source=None, **datetime_args):
+    """
+    pd.to_datetime with the format inferred from a sample unless a format or unit is given. The inferred format is
+    only remembered when a ``source`` names the kind of file, and is checked against a sample of every new column.
+    """
+    if 'format' in datetime_args or 'unit' in datetime_args:
+        return pd.to_datetime(s, **datetime_args)
+
+    dayfirst = datetime_args.get('dayfirst')
+    cached = _time_formats.get(source) if source is not None else None
+    if not cached or ('format' in cached and not _formatFits(s.dropna().iloc[:100].astype(str), cached['format'])):
+        cached = inferTimeFormat(s, dayfirst=dayfirst)
+        # Nothing inferred (eg. the column was already parsed) says nothing about the next files of the source
+        if source is not None and cached:
+            _time_formats[source] = cached
+    try:
+        return pd.to_datetime(s, **cached, **datetime_args)
+    except (ValueError, TypeError):
+        # The format doesn't fit the whole column, let pandas work it out and look again next time
+        _time_formats.pop(source, None)
+        return pd.to_datetime(s, **datetime_args)
+
+def str2dt(df, timeCol='', drop=True, index_name="Timestamp", inplace=False, source=None, **datetime_args):
     """
     Finds the timestamp in a dataframe, translates it to_datetime, renames it "Timestamp", and sets it as the index
     Bumps the index to the first column if it isn't a timestamp
 
+    Unless a ``format`` or ``unit`` is given, the way to parse the column is inferred once from a sample
+    (see inferTimeFormat) and remembered under ``source``, so the next file of the same kind parses directly.
+
     df: DataFrame, required
     timeCol: string, Default: empty
     
@@ -17,39 +101,203 @@ def str2dt(df, timeCol='', drop=True, index_name="Timestamp", **datetime_args):
 
     :param timeCol: Column with the start date for the period,
     :type timeCol: str, default None
+
+    :param inplace: Modify ``df`` instead of working on a shallow copy, and return None
+    :type inplace: bool, default False
+
+    :param source: Key under which the inferred format is cached, e.g. "jool". Without it the format is inferred
+        for this call only
+    :type source: str, default None
     
     :return:  DataFrame
     """
-    df = df.copy()
-    gc.collect()
+    if not inplace:
+        df = df.copy(deep=False)
 
-    commonNames = ['timestamp', 'Date/Time', 'Date', 'Time', "Date and time", "Date & time"]
-    names = [timeCol] if timeCol else commonNames
+    names = {name.lower() for name in ([timeCol] if timeCol else TIMESTAMP_NAMES)}
     df.reset_index(inplace=True, drop=drop)
     
     # Cast columns to str
     df.columns = [str(col) for col in df.columns]
 
     # Get matches with names in the df
-    matches = [col for col in set(df.columns) if col.lower() in (name.lower() for name in names)]
+    matches = [col for col in dict.fromkeys(df.columns) if col.lower() in names]
 
     if not matches:
         raise Exception(f"No timestamp columns found.")
     elif len(matches) > 1:
         raise Exception(f"There are multiple possible timestamps in your df, shown here:\n{matches}")
+
+    col = matches[0]
+    timestamps = _parseTimestamps(df[col], source, **datetime_args)
+
+    df.drop(columns=[col, index_name], inplace=True, errors='ignore')
+    df.index = pd.DatetimeIndex(timestamps, name=index_name)
+    if not inplace:
+        return df
+
+# Number of HH, MM, SS fields packed in the integer times time2timedelta reads without parsing strings
+_PACKED_TIME_FIELDS = {'%H%M': 2, '%H%M%S': 3, '%H:%M': 2, '%H:%M:%S': 3}
+
+def time2timedelta(s, format='%H%M'):
+    """
+    Turn times of day such as 930, "0930" or "09:30" into timedeltas since midnight.
+
+    HHMM and HHMMSS times (with or without colons) are read as integers and split with integer arithmetic, with the
+    ranges checked for the whole column at once. Other formats go through pd.to_datetime.
+
+    :param s: Times of day, NaN gives NaT
+    :type s: Series, required
+
+    :param format: Format of the times
+    :type format: str, default "%H%M"
+
+    :return: Series of timedeltas
+    """
+    if isinstance(s, pd.DataFrame):
+        s = s.squeeze(axis=1)
+    fields = _PACKED_TIME_FIELDS.get(format)
+    if fields is None:
+        s = pd.to_datetime(s.astype(str).str.zfill(4), format=format)
+        return s - s.dt.normalize()
+
+    if pd.api.types.is_numeric_dtype(s):
+        packed = s.to_numpy(dtype=float)
     else:
-        df[index_name] = pd.to_datetime(df[matches[0]], **datetime_args)
-        df.set_index(df[index_name], drop=True, inplace=True)
-        df.drop([index_name, matches[0]], axis=1, inplace=True, errors='ignore')
+        packed = pd.to_numeric(s.astype('string').str.replace(':', '', regex=False).str.strip(),
+                               errors='coerce').to_numpy(dtype=float)
+        # Anything that was there but isn't a number is an error, not a missing value
+        unreadable = np.isnan(packed) & s.notna().to_numpy()
+        if unreadable.any():
+            raise ValueError(f"{unreadable.sum()} times don't match {format}, e.g. {s[unreadable].tolist()[0]!r}")
+
+    known = ~np.isnan(packed)
+    values = np.where(known, packed, 0)
+    hours = values // 100 ** (fields - 1)
+    minutes = values // 100 ** (fields - 2) % 100
+    seconds = values % 100 if fields == 3 else np.zeros_like(values)
+    bad = known & ((values != np.floor(values)) | (hours > 23) | (minutes > 59) | (seconds > 59) | (values < 0))
+    if bad.any():
+        raise ValueError(f"{bad.sum()} times don't match {format}, e.g. {s[bad].tolist()[0]!r}")
+
+    total = np.where(known, hours * 3600 + minutes * 60 + seconds, np.nan)
+    return pd.Series(pd.to_timedelta(total, unit='s'), index=s.index, name=s.name)
+
+def combineDateTime(df, dateCol, timeCol, format='%H%M', drop=True, index_name="Timestamp", source=None,
+                    **datetime_args):
+    """
+    Build the timestamp index from a date column and a separate time of day column, as EMS logs often have them.
+
+    The dates are parsed once per distinct date (see str2dt for the format inference) and the times go through
+    time2timedelta, so there is no need to join them as strings for str2dt.
+
+    :param df: DataFrame with the date and time columns
+    :type df: DataFrame, required
+
+    :param dateCol: Column with the dates
+    :type dateCol: str, required
+
+    :param timeCol: Column with the times of day
+    :type timeCol: str, required
+
+    :param format: Format of the times, see time2timedelta
+    :type format: str, default "%H%M"
+
+    :param drop: Drop the date and time columns
+    :type drop: bool, default True
+
+    :param index_name: Name of the new index
+    :type index_name: str, default "Timestamp"
+
+    :param source: Key under which the inferred date format is cached. Without it the format is inferred for this
+        call only
+    :type source: str, default None
+
+    :param datetime_args: Passed to pd.to_datetime for the dates (format, dayfirst...)
+
+    :return: DataFrame
+    """
+    codes, dates = pd.factorize(df[dateCol])
+    dates = pd.DatetimeIndex(_parseTimestamps(pd.Series(dates), source, **datetime_args)).normalize()
+    timestamps = dates.take(codes, allow_fill=True, fill_value=pd.NaT) + pd.TimedeltaIndex(
+        time2timedelta(df[timeCol], format))
+
+    df = df.drop(columns=[dateCol, timeCol]) if drop else df.copy(deep=False)
+    df.index = pd.DatetimeIndex(timestamps, name=index_name)
     return df
 
-def time2timedelta(s, format='%H%M'):
-    s = s.copy()
-    s = s.squeeze()
-    
-    s = (pd.to_datetime(s.astype(str).str.zfill(4), format=format))
-    s = pd.to_timedelta(s.dt.strftime('%H:%M:%S'))
-    return s
+_CLOSED_SIDES = {'both': ('left', 'right'), 'left': ('left', 'left'), 'right': ('right', 'right'),
+                 'neither': ('right', 'left')}
+
+def windowPositions(index, windows, closed='both'):
+    """
+    Positions delimiting each (start, end) window in a sorted index, found by binary search.
+
+    :param index: Sorted index
+    :type index: Index, required
+
+    :param windows: (start, end) pairs, None leaving that side open
+    :type windows: list of tuples, required
+
+    :param closed: Which ends of the windows are included: "both", "left", "right" or "neither"
+    :type closed: str, default "both"
+
+    :return: list of (first, stop) positions, to be used as ``iloc[first:stop]``
+    """
+    if closed not in _CLOSED_SIDES:
+        raise ValueError(f"closed must be one of {list(_CLOSED_SIDES)}, not '{closed}'")
+    if not index.is_monotonic_increasing:
+        raise ValueError("The index must be sorted to search it, use sort_index() first")
+
+    startSide, endSide = _CLOSED_SIDES[closed]
+    positions = []
+    for start, end in windows:
+        first = 0 if start is None else index.searchsorted(start, side=startSide)
+        stop = len(index) if end is None else index.searchsorted(end, side=endSide)
+        positions.append((first, max(first, stop)))
+    return positions
+
+def timeWindows(df, windows, closed='both'):
+    """
+    Cut several time windows (rolling weeks, baseline and reporting periods...) out of a DataFrame.
+
+    On a sorted index the windows are positional slices found by binary search, so there is no mask to build over the
+    whole index and no copy of the data. Unsorted indexes fall back to boolean masks.
+
+    :param df: Data to cut
+    :type df: DataFrame or Series, required
+
+    :param windows: (start, end) pairs, None leaving that side open
+    :type windows: list of tuples, required
+
+    :param closed: Which ends of the windows are included: "both", "left", "right" or "neither"
+    :type closed: str, default "both"
+
+    :return: list of DataFrames (or Series), one per window
+    """
+    if df.index.is_monotonic_increasing:
+        return [df.iloc[first:stop] for first, stop in windowPositions(df.index, windows, closed)]
+    if closed not in _CLOSED_SIDES:
+        raise ValueError(f"closed must be one of {list(_CLOSED_SIDES)}, not '{closed}'")
+
+    startSide, endSide = _CLOSED_SIDES[closed]
+    views = []
+    for start, end in windows:
+        mask = np.ones(len(df), dtype=bool)
+        if start is not None:
+            mask &= (df.index >= start) if startSide == 'left' else (df.index > start)
+        if end is not None:
+            mask &= (df.index <= end) if endSide == 'right' else (df.index < end)
+        views.append(df.loc[mask])
+    return views
+
+def timeWindow(df, start=None, end=None, closed='both'):
+    """
+    Cut one time window out of a DataFrame, see timeWindows.
+
+    :return: DataFrame (or Series)
+    """
+    return timeWindows(df, [(start, end)], closed)[0]
 
 def getLastNWeeks(df, n, weekday=0, hour=0, minute=0):
     """
@@ -72,13 +320,13 @@ Returns: DataFrame
     if isinstance(df, pd.Series):
         df = df.to_frame()
 
-    df = df.loc[df.index >= startDatetime, :]
-    return df
+    return timeWindow(df, startDatetime)
 
 def overlayPast(df, nDays):
     """
     Run if you want to overlay last year's consumption on the graph. Controlled in the config.
     Currently the figure is not supplied/returned, that'll have to change for abstraction
+    See overlayYears to line up several years at once.
     """
     dfPast = df.copy()
     dfPast.index = df.index+pd.Timedelta(days=nDays)
@@ -88,25 +336,363 @@ def overlayPast(df, nDays):
     return dfPast
 
 
+RESAMPLE_AGGREGATIONS = ('mean', 'sum', 'max', 'min', 'first', 'last', 'count')
+
+def overlayYears(df, n=1, align='date', start=None):
+    """
+    Line the ``n`` previous years up against the same data, for year over year comparisons.
+
+    Every row of the target window (from ``start`` on) gets the values found one, two... years earlier, either on the
+    same calendar date or on the same weekday (shifted by a whole number of weeks closest to the years). Times are
+    matched on the local wall clock, so 8:00 stays 8:00 across DST changes. The previous years are looked up by
+    position in ``df``, there is no shifted copy of the whole history per year.
+
+    :param df: Data with a DatetimeIndex, timezone aware or not
+    :type df: DataFrame or Series, required
+
+    :param n: Number of previous years
+    :type n: int, default 1
+
+    :param align: "date" to match calendar dates, "weekday" to match weekdays
+    :type align: str, default "date"
+
+    :param start: First timestamp of the window to compare, local time if naive. None uses the whole index
+    :type start: datetime, default None
+
+    :return: DataFrame with columns (years_back, column), years_back 0 being the data itself
+    """
+    if isinstance(df, pd.Series):
+        df = df.to_frame()
+    if align not in ('date', 'weekday'):
+        raise ValueError(f"align must be 'date' or 'weekday', not '{align}'")
+
+    index = df.index
+    local = index.tz_localize(None) if index.tz is not None else index
+    # The repeated hour at the end of DST keeps its first occurrence
+    first = ~local.duplicated()
+    lookup = pd.Index(local[first])
+    positions = np.flatnonzero(first)
+
+    if start is None:
+        target = np.arange(len(index))
+    else:
+        start = pd.Timestamp(start)
+        target = np.flatnonzero((local if start.tz is None else index) >= start)
+    targetLocal = local[target]
+
+    views = {}
+    for years in range(n + 1):
+        if years == 0:
+            rows = target
+        else:
+            if align == 'date':
+                shifted = targetLocal - pd.DateOffset(years=years)
+            else:
+                shifted = targetLocal - pd.Timedelta(weeks=round(years * 365.2425 / 7))
+            found = lookup.get_indexer(shifted)
+            rows = np.where(found >= 0, positions[found], -1)
+
+        view = df.iloc[np.maximum(rows, 0)]
+        view = view.where(np.broadcast_to((rows >= 0)[:, np.newaxis], view.shape))
+        views[years] = view.set_axis(index[target])
+
+    return pd.concat(views, axis=1, names=['years_back', df.columns.name])
+
+def resolveAggregations(columns, aggs, default='mean'):
+    """
+    Map every column to the aggregation it should be resampled with.
+
+    Exact column names in ``aggs`` win, then the keys are tried as regex patterns (``re.search``) in the order
+    they were given, and any column left over gets ``default``. A key naming a column is still a pattern for the
+    other columns, unless it isn't a valid regex.
+
+    :param columns: Columns to map
+    :type columns: iterable, required
+
+    :param aggs: Column name or pattern -> aggregation, one of RESAMPLE_AGGREGATIONS
+    :type aggs: dict, required
+
+    :param default: Aggregation for unmatched columns. None drops them
+    :type default: str, default "mean"
+
+    :return: dict column -> aggregation, in the order of ``columns``
+    """
+    for agg in [*aggs.values(), default]:
+        if agg is not None and agg not in RESAMPLE_AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation '{agg}', expected one of {RESAMPLE_AGGREGATIONS}")
+
+    columns = list(columns)
+    patterns = []
+    for key, agg in aggs.items():
+        try:
+            patterns.append((re.compile(str(key)), agg))
+        except re.error:
+            # A column name like 'Flow (m3/h' can only be matched exactly
+            if key not in columns:
+                raise
+    mapping = {}
+    for col in columns:
+        if col in aggs:
+            agg = aggs[col]
+        else:
+            agg = next((agg for pattern, agg in patterns if pattern.search(str(col))), default)
+        if agg is not None:
+            mapping[col] = agg
+    return mapping
+
+def multiResample(df, freq, aggs=None, default='mean', **resample_args):
+    """
+    Resample a DataFrame with a different aggregation per column in a single pass.
+
+    The time bins are computed once and shared by every aggregation, each aggregation then runs once over all
+    of its columns. The result keeps the column order of ``df`` (columns dropped by ``default=None`` excepted).
+
+    :param df: Data with a DatetimeIndex
+    :type df: DataFrame, required
+
+    :param freq: Resampling frequency, anything ``DataFrame.resample`` accepts
+    :type freq: str, required
+
+    :param aggs: Column name or regex pattern -> aggregation (mean, sum, max, min, first, last, count)
+    :type aggs: dict, default None
+
+    :param default: Aggregation for the columns not matched by ``aggs``. None drops them
+    :type default: str, default "mean"
+
+    :param resample_args: Passed on to ``DataFrame.resample`` (closed, label, origin...)
+
+    :return: DataFrame
+
+    Example::
+
+        multiResample(df, '15min', {'ETAT': 'max', 'Energy': 'sum'})
+    """
+    if isinstance(df, pd.Series):
+        df = df.to_frame()
+    mapping = resolveAggregations(df.columns, aggs or {}, default)
+
+    resampler = df.resample(freq, **resample_args)
+    byAgg = {}
+    for col, agg in mapping.items():
+        byAgg.setdefault(agg, []).append(col)
+
+    results = {}
+    index = None
+    for agg, cols in byAgg.items():
+        dfAgg = getattr(resampler[cols], agg)()
+        index = dfAgg.index
+        for i, col in enumerate(cols):
+            results[col] = dfAgg.iloc[:, i]
+
+    if index is None:
+        return pd.DataFrame(index=resampler.size().index)
+    return pd.DataFrame({col: results[col] for col in mapping}, index=index)
+
 def selectiveResample(df, freq, meanCols, sumCols, colOrder=None):
+    """
+    Resample the ``meanCols`` with a mean and the ``sumCols`` with a sum. Columns come out as meanCols then
+    sumCols, or in ``colOrder`` when given. Thin wrapper over multiResample.
+    """
+    meanCols = [meanCols] if isinstance(meanCols, str) else list(meanCols)
+    sumCols = [sumCols] if isinstance(sumCols, str) else list(sumCols)
+    cols = colOrder if colOrder else meanCols + sumCols
 
-    df = df.copy()
+    aggs = {col: 'mean' for col in meanCols}
+    aggs.update({col: 'sum' for col in sumCols})
+    return multiResample(df.loc[:, cols], freq, aggs, default=None)
 
-    dfMean = df.loc[:, meanCols].resample(freq).mean()
-    dfSum = df.loc[:, sumCols].resample(freq).sum()
+class IncrementalResampler:
+    """
+    Resample data that arrives in chunks (a Jool sync, a BMS export being tailed) without going back over the history.
 
-    df = pd.concat([dfMean, dfSum], axis=1)
+    Chunks have to come in time order. Every bin before the one holding the latest timestamp is closed and returned
+    by update(). The rows of that last bin are the only state kept, so memory stays at one bin and an update costs
+    as much as resampling the new chunk. Aggregations follow multiResample and concatenating everything update() and
+    flush() return gives the same frame as resampling the whole history at once.
 
-    if colOrder:
-        df = df[colOrder] 
-        
-    return df
+    :param freq: Resampling frequency
+    :type freq: str, required
+
+    :param aggs: Column name or regex pattern -> aggregation, see multiResample
+    :type aggs: dict, default None
+
+    :param default: Aggregation for the columns not matched by ``aggs``
+    :type default: str, default "mean"
+
+    :param origin: Where the bins start, as in ``DataFrame.resample``. "start_day" is fixed to the day of the first
+        timestamp received. Only used by Tick-like frequencies (h, min, s...), the others follow the calendar
+    :type origin: str or Timestamp, default "start_day"
+
+    Example::
 
-def resample_irregular_monthly_events(df, start_col = 'De', end_col = 'À', day_col = 'Days', event_dates_inclusive=True):
+        resampler = IncrementalResampler('15min', {'ETAT': 'max'})
+        for chunk in chunks:
+            closed = resampler.update(chunk)
+        closed = resampler.flush()
     """
-    **UNTESTED** Resample a set of periods (usually bills) that have have a start and end date.  
+    def __init__(self, freq, aggs=None, default='mean', origin='start_day'):
+        self.freq = freq
+        self.aggs = aggs or {}
+        self.default = default
+        self.origin = origin
+        # pandas ignores (and warns about) origin for calendar frequencies like 'D', 'W' or 'MS'
+        self._tick = isinstance(pd.tseries.frequencies.to_offset(freq), pd.offsets.Tick)
+        self._tail = None
+        self._last = None
+
+    def _resample_args(self):
+        return {'origin': self.origin} if self._tick else {}
+
+    def _resample(self, df):
+        return multiResample(df, self.freq, self.aggs, self.default, **self._resample_args())
+
+    def update(self, chunk):
+        """
+        Add a chunk of data and get back the bins it closed.
+
+        :param chunk: New rows, with a DatetimeIndex starting at or after the last timestamp already received
+        :type chunk: DataFrame, required
+
+        :return: DataFrame of the closed bins, possibly empty
+        """
+        if isinstance(chunk, pd.Series):
+            chunk = chunk.to_frame()
+        if chunk.empty:
+            return chunk.iloc[:0]
+        if not chunk.index.is_monotonic_increasing or (self._last is not None and chunk.index[0] < self._last):
+            raise ValueError("Chunks must be sorted and arrive in time order")
+
+        if self.origin == 'start_day':
+            self.origin = chunk.index[0].normalize()
+        self._last = chunk.index[-1]
+        data = chunk if self._tail is None else pd.concat([self._tail, chunk])
+
+        binned = self._resample(data)
+        # Keep the rows of the last bin. Its label can be either edge ('W', 'ME'... label the right one), so its
+        # first row is found from the bins themselves
+        firstRows = pd.Series(np.arange(len(data)), index=data.index).resample(self.freq, **self._resample_args()).min()
+        self._tail = data.iloc[int(firstRows.iloc[-1]):]
+        return binned.iloc[:-1]
+
+    def flush(self):
+        """
+        Close the trailing bin, at the end of the stream.
+
+        :return: DataFrame with the trailing bin, empty if there was none
+        """
+        if self._tail is None:
+            return pd.DataFrame()
+        binned = self._resample(self._tail)
+        self._tail = None
+        return binned
+
+def _asNanoseconds(dates, normalize=False):
+    """Dates as int64 nanoseconds since the epoch, whatever resolution they came in."""
+    dates = pd.DatetimeIndex(pd.to_datetime(dates))
+    if normalize:
+        dates = dates.normalize()
+    return dates.to_numpy('datetime64[ns]').view('i8')
+
+def _periodEdges(first, last, freq):
+    """Edges (int64 ns) of the ``freq`` periods from the one holding ``first`` to at least one past ``last``."""
+    offset = pd.tseries.frequencies.to_offset(freq)
+    start = offset.rollback(pd.Timestamp(first))
+    return _asNanoseconds(pd.date_range(start, pd.Timestamp(last) + offset, freq=offset))
+
+def prorateIntervals(starts, ends, values, freq='MS', inclusive=True, how='sum', day_col='Days'):
+    """
+    Spread values recorded over irregular intervals (usually bills) onto regular periods.
+
+    Each interval is cut at the period boundaries and every piece gets its share of the interval by day count, all
+    from the start/end arrays without building daily rows. Dates are taken at the day, an interval covers
+    ``[start, end]`` when ``inclusive`` and ``[start, end)`` otherwise. Days that no interval covers count for nothing.
+    An empty interval (start == end, not inclusive) is summed whole into its start period and has no weight in a mean.
+
+    :param starts: Start date of each interval
+    :type starts: array-like of datetimes, required
+
+    :param ends: End date of each interval
+    :type ends: array-like of datetimes, required
+
+    :param values: One row per interval. Non numerical columns are ignored
+    :type values: DataFrame or Series, required
 
-    Takes the entire period from the first start date to the last end date and resamples the data daily. Adds a date column. Resamples the data back to sum of monthly and counts the days as well, giving a final sum per month and a day count for that month.  
+    :param freq: Target periods, anything ``pd.date_range`` accepts
+    :type freq: str, default "MS"
+
+    :param inclusive: Whether the end date belongs to the interval
+    :type inclusive: bool, default True
+
+    :param how: "sum" pro-rates the values by the share of the interval's days falling in each period, "mean" gives
+        the day-weighted average of the values covering each period. A dict column -> how sets it per column
+    :type how: str or dict, default "sum"
+
+    :param day_col: Name of the column counting the interval days in each period. None leaves it out
+    :type day_col: str, default "Days"
+
+    :return: DataFrame indexed by the start of each period from the first to the last interval
+    """
+    if isinstance(values, pd.Series):
+        values = values.to_frame()
+    values = values.select_dtypes('number')
+    day = pd.Timedelta(days=1).value
+
+    starts, ends = pd.DatetimeIndex(pd.to_datetime(starts)), pd.DatetimeIndex(pd.to_datetime(ends))
+    missing = starts.isna() | ends.isna()
+    if missing.any():
+        raise ValueError(f"Intervals without a start or end date, rows: {list(values.index[missing])}")
+    starts = _asNanoseconds(starts, normalize=True)
+    ends = _asNanoseconds(ends, normalize=True) + day * int(inclusive)
+    if (ends < starts).any():
+        raise ValueError("Some intervals end before they start")
+
+    columns = list(values.columns) + ([day_col] if day_col else [])
+    if len(starts) == 0:
+        return pd.DataFrame(columns=columns, index=pd.DatetimeIndex([]), dtype=float)
+
+    edges = _periodEdges(starts.min(), ends.max(), freq)
+
+    # Period of the first and last day of every interval, then one piece per (interval, period)
+    firstPeriod = np.searchsorted(edges, starts, side='right') - 1
+    lastPeriod = np.searchsorted(edges, ends, side='left') - 1
+    # Empty intervals (start == end, exclusive) are kept whole in their start period, with no days
+    empty = ends == starts
+    nPieces = np.where(empty, 1, np.maximum(lastPeriod - firstPeriod + 1, 0))
+    interval = np.repeat(np.arange(len(starts)), nPieces)
+    period = firstPeriod[interval] + np.arange(nPieces.sum()) - np.repeat(np.cumsum(nPieces) - nPieces, nPieces)
+
+    nPeriods = max(period.max() + 1, 1)
+    overlap = (np.minimum(ends[interval], edges[period + 1]) - np.maximum(starts[interval], edges[period])) / day
+    duration = np.where(empty, 1, ends - starts) / day
+    share = np.where(empty[interval], 1., overlap / duration[interval])
+
+    if isinstance(how, str):
+        how = {col: how for col in values.columns}
+    result = {}
+    for col in values.columns:
+        v = values[col].to_numpy(dtype=float)[interval]
+        known = ~np.isnan(v)
+        agg = how.get(col, 'sum')
+        if agg == 'sum':
+            result[col] = np.bincount(period[known], v[known] * share[known],
+                                      minlength=nPeriods)
+        elif agg == 'mean':
+            weight = np.bincount(period[known], overlap[known], minlength=nPeriods)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result[col] = np.bincount(period[known], v[known] * overlap[known], minlength=nPeriods) / weight
+        else:
+            raise ValueError(f"Unknown aggregation '{agg}' for column {col}, expected 'sum' or 'mean'")
+    if day_col:
+        result[day_col] = np.bincount(period, overlap, minlength=nPeriods)
+
+    return pd.DataFrame(result, index=pd.DatetimeIndex(edges[:nPeriods]), columns=columns)
+
+def resample_irregular_monthly_events(df, start_col = 'De', end_col = 'À', day_col = 'Days', event_dates_inclusive=True, freq='MS'):
+    """
+    Resample a set of periods (usually bills) that have have a start and end date.  
+
+    Each numerical column is pro-rated over the days of its period and summed per month (or ``freq``), with a day
+    column counting the billed days falling in each month. See prorateIntervals.
 
     :param df: DataFrame with the data to be resctrutures. Will ignore any non-numerical columns
     :type df: DataFrame, required 
@@ -122,28 +708,110 @@ def resample_irregular_monthly_events(df, start_col = 'De', end_col = 'À', day_
     
     :param event_dates_inclusive: Whether the dates in the event are inclusive. This is normally the case for events and usually is for bills as well
     :type event_dates_inclusive: bool, default True
+
+    :param freq: Periods to resample to
+    :type freq: str, default "MS"
     
     :return:  DataFrame
 
     """ 
-    dfR = df.reset_index(drop=True)
+    dfR = prorateIntervals(df[start_col], df[end_col], df.drop([start_col, end_col], axis=1), freq=freq,
+                           inclusive=event_dates_inclusive, day_col=day_col)
+    dfR.index.name = start_col
 
-    # normalize the event to the number of days in the cycle
-    # Need to add one to the date delta because bill dates are inclusive. But they aren`t always inclusive...
-    
-    for col in dfR.select_dtypes(include='number'):#.columns.drop([start_col, end_col]):
-        dfR[col] = dfR.apply(lambda x: x[col] / ((x[end_col] - x[start_col]).days + int(event_dates_inclusive)), axis=1)
+    return dfR
 
-    dfR = pd.concat([dfR.set_index(start_col), dfR.set_index(end_col)]).drop([start_col, end_col], axis=1)
-    dfR = dfR[~dfR.index.duplicated(keep="first")]
-    dfR.index = pd.to_datetime(dfR.index)
-    dfR.index.name = start_col
+def degreeDays(temps, balance_points, periods=None, start_col='De', end_col='À', freq='MS', inclusive=True,
+               kinds=('HDD', 'CDD'), temp_col='T2M', day_col='Days'):
+    """
+    Heating and cooling degree days for several balance points at once, summed over bill periods or regular periods.
 
-    dfR = dfR.select_dtypes("number")
-    dfR = dfR.resample("D").first()
-    dfR = dfR.ffill()
+    Every sample contributes ``max(balance - T, 0)`` (HDD) or ``max(T - balance, 0)`` (CDD) times its length in days,
+    so daily means give the classic mean-temperature degree days and hourly data integrates them. All balance points
+    are computed in one broadcast and summed onto the periods through cumulative sums, so the cost doesn't grow with
+    the number of periods or how irregular they are. A sample counts in a period when its timestamp falls in it.
 
-    dfR[day_col] = 1
-    dfR = selectiveResample(dfR, 'MS', [], dfR.columns) 
+    :param temps: Temperatures with a DatetimeIndex, e.g. the output of getNasaWeather
+    :type temps: Series or DataFrame, required
+
+    :param balance_points: Balance temperatures, in the units of ``temps``
+    :type balance_points: float or list of floats, required
+
+    :param periods: Bills with a start and end date column. None cuts the weather into regular ``freq`` periods
+    :type periods: DataFrame, default None
+
+    :param start_col: Column of ``periods`` with the start dates
+    :type start_col: str, default "De"
+
+    :param end_col: Column of ``periods`` with the end dates
+    :type end_col: str, default "À"
+
+    :param freq: Periods to use when ``periods`` isn't given
+    :type freq: str, default "MS"
+
+    :param inclusive: Whether the end dates of ``periods`` are part of the period
+    :type inclusive: bool, default True
+
+    :param kinds: Which degree days to compute, "HDD" and/or "CDD"
+    :type kinds: tuple, default ("HDD", "CDD")
+
+    :param temp_col: Column to use when ``temps`` is a DataFrame
+    :type temp_col: str, default "T2M"
+
+    :param day_col: Name of the column counting the days of weather data in each period. None leaves it out
+    :type day_col: str, default "Days"
+
+    :return: DataFrame with one column per kind and balance point ("HDD_18", "CDD_22.5"...), indexed like ``periods``
+        or by the start of each regular period
+
+    Example::
+
+        weather = getNasaWeather(plant, dates)
+        x = degreeDays(weather, [12, 15, 18], periods=bills)
+        models.regression(x[['HDD_15']], bills['Consommation'])
+    """
+    if isinstance(temps, pd.DataFrame):
+        temps = temps[temp_col]
+    if not temps.index.is_monotonic_increasing:
+        temps = temps.sort_index()
+    for kind in kinds:
+        if kind not in ('HDD', 'CDD'):
+            raise ValueError(f"Unknown degree day kind '{kind}', expected 'HDD' or 'CDD'")
+
+    day = pd.Timedelta(days=1).value
+    times = _asNanoseconds(temps.index)
+    values = temps.to_numpy(dtype=float)
+    step = np.median(np.diff(times)) / day if len(times) > 1 else 1.
+    bases = np.atleast_1d(np.asarray(balance_points, dtype=float))
+
+    # (balance points, samples) in one go, missing temperatures count for nothing. The extra zero sample at the end
+    # lets periods reaching past the weather data be summed with reduceat
+    below = (bases[:, np.newaxis] - values[np.newaxis, :]) * step
+    columns = [f"{kind}_{base:g}" for kind in kinds for base in bases] + ([day_col] if day_col else [])
+    features = np.zeros((len(columns), len(values) + 1))
+    for i, kind in enumerate(kinds):
+        np.fmax(below if kind == 'HDD' else -below, 0, out=features[i * len(bases):(i + 1) * len(bases), :-1])
+    if day_col:
+        features[-1, :-1] = ~np.isnan(values) * step
+
+    if periods is None:
+        edges = _periodEdges(times.min(), times.max(), freq)
+        edges = edges[:np.searchsorted(edges, times.max(), side='right') + 1]
+        starts, ends, index = edges[:-1], edges[1:], pd.DatetimeIndex(edges[:-1])
+    else:
+        starts = _asNanoseconds(periods[start_col], normalize=True)
+        ends = _asNanoseconds(periods[end_col], normalize=True) + day * int(inclusive)
+        index = periods.index
+
+    first, last = np.searchsorted(times, starts), np.searchsorted(times, ends)
+    bounds = np.column_stack([first, last]).ravel()
+    if np.all(np.diff(bounds) >= 0):
+        # Sorted periods that don't overlap are summed exactly, one segment each
+        totals = np.add.reduceat(features, bounds, axis=1)[:, ::2]
+        totals[:, first == last] = 0
+    else:
+        cumulative = np.zeros_like(features)
+        np.cumsum(features[:, :-1], axis=1, out=cumulative[:, 1:])
+        totals = cumulative[:, last] - cumulative[:, first]
 
-    return dfR
\ No newline at end of file
+    return pd.DataFrame(totals.T, index=index, columns=columns)
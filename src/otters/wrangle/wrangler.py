@@ -1,45 +1,399 @@
+import re
+
 import pandas as pd
 import numpy as np
 
+def _runStarts(df):
+    """Positions where any column of ``df`` changes value, NaN being equal to NaN."""
+    changed = np.zeros(max(len(df) - 1, 0), dtype=bool)
+    for col in df.columns:
+        values = df[col].to_numpy()
+        if values.dtype.kind == 'f':
+            missing = np.isnan(values)
+            changed |= (values[1:] != values[:-1]) & ~(missing[1:] & missing[:-1])
+        elif values.dtype.kind in 'biu':
+            changed |= values[1:] != values[:-1]
+        else:
+            codes = pd.factorize(df[col], use_na_sentinel=False)[0]
+            changed |= codes[1:] != codes[:-1]
+    return np.r_[0, np.flatnonzero(changed) + 1] if len(df) else np.array([], dtype=int)
+
+class Runs():
+    """
+    Run-length encoding of a Series or DataFrame: the positions where each run of identical values starts and ends.
+
+    Runs are kept as two position arrays, the data of a run is only sliced out (as a view) when asked for.
+    Indexing with an int gives that run's data, indexing with a mask, slice or list of positions gives the matching
+    subset of runs, e.g. `runs[runs.values['ETAT'] == 1]`.
+
+    **Attributes:**  
+    > **data:** *Series or DataFrame*  
+    >> The encoded data  
+
+    > **starts:** *np.ndarray*  
+    >> Position of the first row of each run  
+
+    > **ends:** *np.ndarray*  
+    >> Position after the last row of each run  
+    """
+    def __init__(self, data, starts, ends):
+        self.data = data
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        for start, end in zip(self.starts, self.ends):
+            yield self.data.iloc[start:end]
+
+    def __getitem__(self, key):
+        if np.ndim(key) == 0 and not isinstance(key, slice):
+            return self.data.iloc[self.starts[key]:self.ends[key]]
+        key = np.asarray(key) if not isinstance(key, slice) else key
+        return Runs(self.data, self.starts[key], self.ends[key])
+
+    def __repr__(self):
+        return f"Runs({len(self)} runs over {len(self.data)} rows)"
+
+    @property
+    def values(self):
+        """Value of each run, indexed by the run's first timestamp"""
+        return self.data.iloc[self.starts]
+
+    @property
+    def lengths(self):
+        """Number of rows in each run"""
+        return self.ends - self.starts
+
+    def duration(self):
+        """
+        Time covered by each run, from its first timestamp to the first timestamp of the row after it.  
+        The last row of the data is given the median time step of the index.
+
+        **Returns:**  
+        > **Series** of timedeltas indexed by the run's first timestamp
+        """
+        index = self.data.index
+        step = np.median(np.diff(index.to_numpy())) if len(index) > 1 else np.timedelta64(0)
+        stops = index[np.minimum(self.ends, len(index) - 1)].to_numpy()
+        stops = np.where(self.ends == len(index), stops + step, stops)
+        return pd.Series(stops - index[self.starts].to_numpy(), index=index[self.starts], name='duration')
+
+    def aggregate(self, data=None, how=('sum', 'mean')):
+        """
+        Aggregate data over each run in one vectorized pass per column, NaN being ignored.
+
+        **Parameters:**  
+        > **data:** *Series or DataFrame, default: the encoded data*  
+        >> Rows lined up with the encoded data (e.g. the power while a flag is on). Non numeric columns are skipped
+
+        > **how:** *str or list of strs, default: `('sum', 'mean')`*  
+        >> Any of `'sum'`, `'mean'`, `'min'`, `'max'`, `'count'`
+
+        **Returns:**  
+        > **DataFrame** indexed by the run's first timestamp, with (column, how) columns
+        """
+        data = self.data if data is None else data
+        if len(data) != len(self.data):
+            raise ValueError(f"The data has {len(data)} rows, the runs were encoded over {len(self.data)}")
+        if isinstance(data, pd.Series):
+            data = data.to_frame()
+        how = [how] if isinstance(how, str) else list(how)
+        reducers = {'sum': np.add, 'min': np.fmin, 'max': np.fmax}
+        for agg in how:
+            if agg not in [*reducers, 'mean', 'count']:
+                raise ValueError(f"Unknown aggregation '{agg}'")
+
+        # reduceat sums between consecutive bounds, so it needs the runs in order. A sentinel row lets the last run
+        # end at len(data)
+        bounds = np.column_stack([self.starts, self.ends]).ravel()
+        if np.any(np.diff(bounds) < 0):
+            unique, inverse = np.unique(self.starts, return_inverse=True)
+            ends = np.empty_like(unique)
+            ends[inverse] = self.ends
+            aggregated = Runs(self.data, unique, ends).aggregate(data, how)
+            return aggregated.iloc[inverse]
+        results = {}
+        for col in data.select_dtypes('number').columns:
+            values = np.append(data[col].to_numpy(dtype=float), np.nan)
+            known = ~np.isnan(values)
+            count = np.add.reduceat(known, bounds)[::2]
+            total = np.add.reduceat(np.where(known, values, 0), bounds)[::2]
+            for agg in how:
+                if agg == 'count':
+                    result = count
+                elif agg == 'mean':
+                    with np.errstate(invalid='ignore', divide='ignore'):
+                        result = total / count
+                elif agg == 'sum':
+                    result = total
+                else:
+                    result = np.where(count > 0, reducers[agg].reduceat(values, bounds)[::2], np.nan)
+                results[(col, agg)] = result
+        return pd.DataFrame(results, index=self.data.index[self.starts])
+
+    def to_frame(self):
+        """
+        The runs as a table: value(s), first and last timestamp, number of rows and duration of each run.
+
+        **Returns:**  
+        > **DataFrame**
+        """
+        values = self.values
+        df = values.to_frame() if isinstance(values, pd.Series) else values.copy()
+        df['start'] = self.data.index[self.starts]
+        df['end'] = self.data.index[self.ends - 1]
+        df['length'] = self.lengths
+        if isinstance(self.data.index, pd.DatetimeIndex):
+            df['duration'] = self.duration().to_numpy()
+        return df.reset_index(drop=True)
+
+def runLengthEncode(data):
+    """
+    Split data into runs of identical consecutive values.  
+    With several columns a new run starts whenever any of them changes. NaN counts as a value, so missing stretches
+    are runs of their own.
+
+    **Parameters:**  
+    > **data:** *Series or DataFrame, required*  
+    >> Typically a flag or state column (ETAT, occupancy...)
+
+    **Returns:**  
+    > **Runs**
+    """
+    df = data.to_frame() if isinstance(data, pd.Series) else data
+    starts = _runStarts(df)
+    return Runs(data, starts, np.append(starts[1:], len(df)).astype(int))
+
 def gapAndIsland(dfCol):
     """
     Takes an np.series data type (ie. a df single column)
     returns the entire column broken up into sections where all the numbers are the same. 
     Good for iterating on an events column or tracking flags. 
 
-    new: dfCol can be df with one column or series
+    new: dfCol can be df with one column or series. The sections are views and NaN stretches are kept together,
+    see runLengthEncode for the compact version.
 
     **Parameters:**  
     > **dfCol: *a single df column or series, Required***  
 
     **Returns:**  
-    > **Series**
+    > **list of Series**
+    """
+    return list(runLengthEncode(dfCol.squeeze(axis=1) if isinstance(dfCol, pd.DataFrame) else dfCol))
+
+def _asNumbers(index):
+    """Timestamps and timedeltas as int64 nanoseconds, anything else as floats"""
+    if isinstance(index, (pd.DatetimeIndex, pd.TimedeltaIndex)):
+        return index.as_unit('ns').asi8
+    return index.to_numpy(dtype=float)
+
+def mergeIntervals(intervals, within=0, start_col='start', end_col='end', by=None):
     """
-    return np.split(dfCol.squeeze(), np.where(np.diff(dfCol.squeeze()) != 0)[0]+1)
+    Merge intervals that overlap or are separated by at most `within`, in one sorted sweep.  
+    Chains with runLengthEncode: `mergeIntervals(runs[runs.values == 1], within='12h')`
+
+    **Parameters:**  
+    > **intervals:** *DataFrame, Runs or (starts, ends), required*  
+    >> A DataFrame with start and end columns, Runs (from runLengthEncode, using each run's first and last timestamp)
+    or a pair of start and end arrays. Timestamps, timedeltas or numbers  
+
+    > **within:** *Timedelta, str or number, default: `0`*  
+    >> Largest gap that still gets merged, in the units of the intervals. For timestamps and timedeltas, a Timedelta
+    or a string like `'12h'`: bare numbers other than 0 are rejected as their unit would be ambiguous  
+
+    > **start_col:** *str, default: `'start'`*  
+    > **end_col:** *str, default: `'end'`*  
+    >> Columns of the DataFrame holding the starts and ends
+
+    > **by:** *str or array, default: `None`*  
+    >> Only merge intervals sharing this key (e.g. the equipment). A column of the DataFrame or one key per interval
+
+    **Returns:**  
+    > **DataFrame** with `start`, `end`, `count` (number of intervals merged), `first` and `last` (positions in the
+    input of the first interval merged and of the one reaching the furthest) columns, sorted by start. With `by`, the
+    key comes first (named after the column, or `group`) and the intervals are sorted by key, then start
+    """
+    if isinstance(intervals, Runs):
+        intervals = intervals.to_frame()
+    byName = by if isinstance(by, str) else 'group'
+    if isinstance(intervals, pd.DataFrame):
+        starts, ends = intervals[start_col], intervals[end_col]
+        if isinstance(by, str):
+            by = intervals[by]
+    else:
+        starts, ends = intervals
+    starts, ends = pd.Index(starts), pd.Index(ends)
+    if len(starts) != len(ends):
+        raise ValueError(f"Got {len(starts)} starts and {len(ends)} ends")
+    if len(starts) == 0:
+        merged = pd.DataFrame({'start': starts, 'end': ends, 'count': [], 'first': [], 'last': []})
+        return merged if by is None else merged.assign(**{byName: []})[[byName, *merged.columns]]
+
+    if by is None:
+        order = starts.argsort(kind='stable')
+        codes = np.zeros(len(starts), dtype=int)
+    else:
+        codes, keys = pd.factorize(np.asarray(by))
+        order = np.lexsort((_asNumbers(starts), codes))
+        codes = codes[order]
+    starts, ends = starts[order], ends[order]
+    startValues, endValues = _asNumbers(starts), _asNumbers(ends)
+    if (endValues < startValues).any():
+        raise ValueError("Some intervals end before they start")
+    if isinstance(starts, (pd.DatetimeIndex, pd.TimedeltaIndex)):
+        if isinstance(within, (int, float, np.number)) and within != 0:
+            raise ValueError(f"within={within!r} has no unit, pass a Timedelta or a string like '12h' for timestamps")
+        within = pd.Timedelta(within).value
+
+    # A new interval starts wherever the gap to everything before it (with the same key) is more than `within`
+    if by is None:
+        reach = np.maximum.accumulate(endValues)
+    else:
+        reach = pd.Series(endValues).groupby(codes).cummax().to_numpy()
+    new = np.r_[True, (startValues[1:] - reach[:-1] > within) | (codes[1:] != codes[:-1])]
+    firsts = np.flatnonzero(new)
+    group = np.cumsum(new) - 1
+    # The last of each group once sorted by end is the one reaching the furthest
+    lasts = np.lexsort((endValues, group))[np.r_[firsts[1:], len(group)] - 1]
+
+    merged = pd.DataFrame({
+        'start': starts[firsts],
+        'end': ends[lasts],
+        'count': np.diff(np.r_[firsts, len(group)]),
+        'first': order[firsts],
+        'last': order[lasts],
+    })
+    if by is not None:
+        merged.insert(0, byName, keys[codes[firsts]])
+    return merged
 
 def mergeCloseEvents(events, mergeWithinHours=12, i=1):
     """
     Merges events that are close so we don't get bunches of events. Not entirely necessary but it makes it cleaner. 
-    Recursive function, so it takes each event and calculates if it's within "mergeWithinHours" (in hours) of the last event. 
-    If so it adds this event to the last event and deletes this event.
-    returns the new list of events
+    Takes each event (a list with the start first and the end last) from the `i`th on and merges it into the previous
+    one if it starts within "mergeWithinHours" (in hours) of its end. The events are sorted and merged in one sweep by
+    mergeIntervals, so the merged event ends with the latest end of the events it absorbed.
+    `events` is modified in place, like the recursive version did.
+    returns the list of events
     """
     if i >= len(events):
         return events
-    
-    eventStart = events[i][0]
-    eventEnd = events[i][-1]
-    lastEventEnd = events[i-1][-1]
-
-    if ((eventStart-lastEventEnd).total_seconds()/3600)<=mergeWithinHours:
-        events[i-1][-1] = events[i][-1]
-        events.pop(i)
-        events = mergeCloseEvents(events, i = i)
-        
-    else:
-        mergeCloseEvents(events, i=i+1)
+
+    head = events[max(i, 1) - 1:]
+    merged = mergeIntervals(([event[0] for event in head], [event[-1] for event in head]),
+                            within=pd.Timedelta(hours=mergeWithinHours))
+    mergedEvents = []
+    for first, end in zip(merged['first'], merged['end']):
+        head[first][-1] = end
+        mergedEvents.append(head[first])
+    events[max(i, 1) - 1:] = mergedEvents
     return events
 
+def detectEvents(df, columns=None, condition=None, energy=None, min_duration=None, merge_within=None):
+    """
+    Find when each of many equipment columns is running (or in alarm) and tabulate the events.  
+    All the columns are scanned at once: the condition becomes one boolean array and the events are its rising and
+    falling edges. Events of the same equipment separated by at most `merge_within` are merged (mergeIntervals), then
+    the ones shorter than `min_duration` are dropped.
+
+    **Parameters:**  
+    > **df:** *DataFrame, required*  
+    >> State or measurement columns with a sorted DatetimeIndex  
+
+    > **columns:** *list or str, default: `None`*  
+    >> Columns to scan, or a regex pattern picking them (e.g. `'ETAT'`). All columns by default  
+
+    > **condition:** *number or callable, default: `None`*  
+    >> When a column is in an event. None means non zero (states), a number means above that threshold and a callable
+    gets the DataFrame of columns and returns a boolean one. Missing values are never in an event  
+
+    > **energy:** *Series or DataFrame, default: `None`*  
+    >> Energy per row (e.g. kWh per interval) summed over each event. A Series is used for every column, a DataFrame
+    is matched to the scanned columns by name (columns without a match get NaN)  
+
+    > **min_duration:** *Timedelta or str, default: `None`*  
+    >> Shortest event kept, after merging  
+
+    > **merge_within:** *Timedelta or str, default: `None`*  
+    >> Events of the same column separated by at most this much are merged, the gap becoming part of the event
+
+    **Returns:**  
+    > **DataFrame** with one row per event: `entity` (the column), `start`, `end` (last timestamp in the event),
+    `duration` (until the next timestamp after the event) and `energy` if given, sorted by entity then start
+
+    Example:  
+    `detectEvents(df, 'ETAT', energy=kwh, min_duration='5min', merge_within='15min')`
+    """
+    if columns is None:
+        columns = list(df.columns)
+    elif isinstance(columns, str):
+        pattern = re.compile(columns)
+        columns = [col for col in df.columns if pattern.search(str(col))]
+    data = df[columns]
+
+    if condition is None:
+        # NaN compares False
+        active = np.abs(data.to_numpy(dtype=float)) > 0
+    elif callable(condition):
+        active = np.asarray(condition(data), dtype=bool)
+    else:
+        active = data.to_numpy(dtype=float) > condition
+
+    # Rising (+1) and falling (-1) edges of every column at once, padded so events can touch the edges
+    n = len(df)
+    edges = np.zeros((len(columns), n + 2), dtype=np.int8)
+    edges[:, 1:-1] = active.T
+    # Within a column the edges alternate rising, falling, so once ordered by column they pair up
+    entities, rows = np.nonzero(np.diff(edges, axis=1))
+    entities, startRows, stopRows = entities[::2], rows[::2], rows[1::2]
+
+    index = df.index
+    if n == 0:
+        # Nothing to scan, and no time step to end the events with
+        events = pd.DataFrame({'entity': pd.Series(dtype='str'), 'start': index[:0], 'end': index[:0],
+                               'duration': index[:0] - index[:0]})
+        return events if energy is None else events.assign(energy=pd.Series(dtype=float))
+    if merge_within is not None and len(startRows):
+        events = pd.DataFrame({'entity': entities, 'start': index[startRows], 'end': index[stopRows - 1]})
+        merged = mergeIntervals(events, within=merge_within, by='entity')
+        entities, startRows, stopRows = (merged['entity'].to_numpy(), startRows[merged['first']],
+                                         stopRows[merged['last']])
+
+    step = np.median(np.diff(index.to_numpy())) if n > 1 else np.timedelta64(0)
+    stops = index[np.minimum(stopRows, n - 1)].to_numpy()
+    stops = np.where(stopRows == n, stops + step, stops)
+    events = pd.DataFrame({
+        'entity': np.asarray(columns, dtype=object)[entities],
+        'start': index[startRows],
+        'end': index[stopRows - 1],
+        'duration': pd.to_timedelta(stops - index[startRows].to_numpy()),
+    })
+
+    if energy is not None:
+        if isinstance(energy, pd.Series):
+            shared = energy.reindex(index).to_numpy(dtype=float)
+        else:
+            energy = energy.reindex(index=index, columns=columns)
+        # The events of an entity are sorted and don't overlap, so each column is summed in one reduceat
+        totals = np.full(len(entities), np.nan)
+        bounds = np.column_stack([startRows, stopRows])
+        for entity in np.unique(entities):
+            which = np.flatnonzero(entities == entity)
+            values = shared if isinstance(energy, pd.Series) else energy.iloc[:, entity].to_numpy(dtype=float)
+            missing = np.isnan(values)
+            if missing.all():
+                continue
+            values = np.append(np.where(missing, 0, values), 0)
+            totals[which] = np.add.reduceat(values, bounds[which].ravel())[::2]
+        events['energy'] = totals
+
+    if min_duration is not None:
+        events = events.loc[events['duration'] >= pd.Timedelta(min_duration)]
+    return events.reset_index(drop=True)
+
 def merge_dfs(dfs):
     """
     Merge 2 or more dfs where you have some overlapping data.  
@@ -0,0 +1,35 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from otters.wrangle import db_loader
+from otters.wrangle import psychrometrics as psy
+from otters.wrangle import psychrometrics_vec as psyv
+
+
+@pytest.fixture
+def plants_db(tmp_path):
+    db_loc = str(tmp_path / 'meta.db')
+    conn = sqlite3.connect(db_loc)
+    pd.DataFrame({'plant': ['Sea', 'Hill', 'Nowhere'], 'latitude': [45., 46., 47.], 'longitude': [-73., -72., -71.],
+                  'altitude': [0., 1000., None]}).to_sql('plants', conn, index=False)
+    conn.close()
+    return db_loc
+
+
+def test_get_plant_pressure(plants_db):
+    assert db_loader.getPlantPressure('Sea', plants_db, units=psy.SI) == pytest.approx(101325.)
+    assert db_loader.getPlantPressure('Hill', plants_db, units=psy.IP) == pytest.approx(
+        psyv.ip.GetStandardAtmPressure(1000 / 0.3048))
+
+    with pytest.warns(UserWarning):
+        pressures = db_loader.getPlantPressure(['Hill', 'Nowhere'], plants_db, units=psy.SI)
+    assert pressures['Hill'] == pytest.approx(psyv.si.GetStandardAtmPressure(1000.))
+    assert pressures['Nowhere'] == pytest.approx(101325.)
+
+    # Cached: the db is not read again
+    conn = sqlite3.connect(plants_db)
+    conn.execute('DROP TABLE plants')
+    conn.close()
+    assert db_loader.getPlantPressure('Hill', plants_db, units=psy.SI) == pressures['Hill']
@@ -0,0 +1,39 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from otters.vis import graph
+from otters.wrangle import psychrometrics as psy
+
+
+def test_psychro_chart(tmp_path):
+    psy.SetUnitSystem(psy.SI)
+    lines = graph.psychroChartLines(cache_dir=str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 1
+    cached = graph.psychroChartLines(cache_dir=str(tmp_path))
+    for family, (x, y) in lines.items():
+        np.testing.assert_array_equal(cached[family][1], y)
+        # Every line lies on or below the saturation curve
+        assert (y[np.isfinite(y)] <= 30).all()
+
+    df = pd.DataFrame({'OAT': [0., 10., 20., 30.], 'RH': [50., 60., 70., 80.]})
+    plot = graph.Graph(df).plot
+    plot.addPsychroChart('OAT', rhCol='RH', cache_dir=str(tmp_path))
+    states = plot.fig.data[-1]
+    assert states.type == 'scattergl'
+    np.testing.assert_allclose(states.y[1], 1000 * psy.GetHumRatioFromRelHum(10., 0.6, 101325.))
+
+    plot = graph.Graph(df).plot
+    plot.addPsychroChart('OAT', rhCol='RH', bins=10, cache_dir=str(tmp_path))
+    assert plot.fig.data[-1].type == 'histogram2d'
+
+    # Trends indexed by time get date ticks by default, which a psychrometric chart doesn't want
+    df.index = pd.date_range('2024-07-01', periods=len(df), freq='h')
+    plot = graph.Graph(df).plot
+    assert plot.fig.layout.xaxis.tickformat is not None
+    plot.addPsychroChart('OAT', rhCol='RH', cache_dir=str(tmp_path))
+    xaxis = plot.fig.layout.xaxis
+    assert xaxis.type == 'linear'
+    assert xaxis.tickformat is None and xaxis.tick0 is None and xaxis.dtick is None
+    np.testing.assert_allclose(plot.fig.data[-1].x, df['OAT'])
@@ -0,0 +1,270 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from otters.wrangle import psychrometrics as psy
+from otters.wrangle import psychrometrics_vec as psyv
+
+
+@pytest.fixture(params=[psy.SI, psy.IP])
+def units(request):
+    psy.SetUnitSystem(request.param)
+    yield request.param
+    psy.SetUnitSystem(psy.SI)
+
+
+def _grid(units):
+    if units == psy.SI:
+        tdb = np.linspace(-30, 45, 16)
+        pressure = 101325.
+    else:
+        tdb = np.linspace(-22, 113, 16)
+        pressure = 14.696
+    tdb, rh = np.meshgrid(tdb, np.linspace(0.05, 1, 8))
+    return tdb.ravel(), rh.ravel(), pressure
+
+
+def test_vectorized_matches_scalar(units):
+    tdb, rh, pressure = _grid(units)
+
+    expected = np.array([psy.CalcPsychrometricsFromRelHum(t, r, pressure) for t, r in zip(tdb, rh)]).T
+    results = psyv.CalcPsychrometricsFromRelHum(tdb, rh, pressure)
+
+    for result, exp in zip(results, expected):
+        np.testing.assert_allclose(result, exp, rtol=1e-9)
+
+
+def test_vectorized_keeps_shape():
+    psy.SetUnitSystem(psy.SI)
+    s = pd.Series([20., 25., np.nan], index=pd.date_range('2024-01-01', periods=3, freq='h'))
+
+    assert isinstance(psyv.GetSatVapPres(20.), float)
+    assert psyv.GetSatVapPres(20.) == pytest.approx(psy.GetSatVapPres(20.))
+
+    result = psyv.GetTDewPointFromRelHum(s, 0.5)
+    assert isinstance(result, pd.Series)
+    assert result.index.equals(s.index)
+    assert np.isnan(result.iloc[-1])
+
+    with pytest.raises(ValueError):
+        psyv.GetHumRatioFromRelHum(s, 1.5, 101325.)
+
+
+def test_dew_point_solver_masks_bad_points():
+    psy.SetUnitSystem(psy.SI)
+    tdb = np.array([20., 25., 30., 22.])
+    vap_pres = np.array([1000., 1e7, 2000., np.nan])
+
+    result, converged = psyv.GetTDewPointFromVapPres(tdb, vap_pres, return_mask=True)
+
+    np.testing.assert_array_equal(converged, [True, False, True, False])
+    assert np.isnan(result[[1, 3]]).all()
+    assert result[0] == pytest.approx(psy.GetTDewPointFromVapPres(20., 1000.))
+    assert result[2] == pytest.approx(psy.GetTDewPointFromVapPres(30., 2000.))
+
+
+def test_wet_bulb_solver_methods(units):
+    tdb, rh, pressure = _grid(units)
+    hum_ratio = psyv.GetHumRatioFromRelHum(tdb, rh, pressure)
+
+    bisection, n_bisection = psyv.GetTWetBulbFromHumRatio(tdb, hum_ratio, pressure, return_iterations=True)
+    illinois, n_illinois = psyv.GetTWetBulbFromHumRatio(tdb, hum_ratio, pressure, method='illinois',
+                                                        return_iterations=True)
+
+    # Away from the freezing discontinuity both methods find the same root
+    freezing = 0. if units == psy.SI else 32.
+    clear = np.abs(bisection - freezing) > 1
+    np.testing.assert_allclose(illinois[clear], bisection[clear], atol=psy.PSYCHROLIB_TOLERANCE)
+    assert n_illinois.mean() < n_bisection.mean()
+
+    assert np.isnan(psyv.GetTWetBulbFromHumRatio(tdb, hum_ratio, pressure, max_iter=2)).any()
+
+
+def test_tabulated_sat_vap_pres(units):
+    tdb, rh, pressure = _grid(units)
+    t = np.linspace(-148., 392., 100001) if units == psy.IP else np.linspace(-100., 200., 100001)
+    exact = psyv.GetSatVapPres(t)
+    expected = psyv.CalcPsychrometricsFromRelHum(tdb, rh, pressure)
+
+    psyv.SetSatVapPresMode('table')
+    try:
+        assert np.max(np.abs(psyv.GetSatVapPres(t) / exact - 1)) <= psyv.SAT_VAP_PRES_TABLE_MAX_REL_ERROR
+        for result, exp in zip(psyv.CalcPsychrometricsFromRelHum(tdb, rh, pressure), expected):
+            np.testing.assert_allclose(result, exp, rtol=1e-9)
+    finally:
+        psyv.SetSatVapPresMode('exact')
+
+    with pytest.raises(ValueError):
+        psyv.SetSatVapPresMode('spline')
+
+
+def test_unit_namespaces_run_concurrently():
+    from concurrent.futures import ThreadPoolExecutor
+
+    psy.SetUnitSystem(psy.SI)
+    expected_si = psy.CalcPsychrometricsFromRelHum(25., 0.5, 101325.)
+    psy.SetUnitSystem(psy.IP)
+    expected_ip = psy.CalcPsychrometricsFromRelHum(77., 0.5, 14.696)
+    psy.SetUnitSystem(psy.SI)
+    sat_vap_pres_si = psy.GetSatVapPres(20.)
+
+    jobs = [(psyv.si, 25., 101325.), (psyv.ip, 77., 14.696)] * 20
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda job: job[0].CalcPsychrometricsFromRelHum(job[1], 0.5, job[2]), jobs))
+
+    for result, (namespace, _, _) in zip(results, jobs):
+        assert result == pytest.approx(expected_si if namespace is psyv.si else expected_ip)
+    assert psy.GetUnitSystem() == psy.SI
+
+    with psyv.UnitSystemContext(psy.IP):
+        assert psyv.GetSatVapPres(68.) == pytest.approx(psyv.ip.GetSatVapPres(68.))
+        assert psyv.si.GetSatVapPres(20.) == pytest.approx(sat_vap_pres_si)
+    assert psy.GetUnitSystem() == psy.SI
+
+
+@pytest.mark.skipif(psy.has_numba, reason="contexts of the scalar module need pure-Python functions")
+def test_scalar_unit_contexts():
+    psy.SetUnitSystem(psy.SI)
+    with psy.UnitSystemContext(psy.IP):
+        assert psy.isIP()
+        assert psy.GetSatVapPres(68.) == pytest.approx(psy.ip.GetSatVapPres(68.))
+        assert psyv.si.GetSatVapPres(20.) == pytest.approx(psy.si.GetSatVapPres(20.))
+        assert psy.isIP() and psy.GetUnitSystem() == psy.IP
+    assert not psy.isIP()
+
+
+def test_numba_unit_contexts():
+    pytest.importorskip('numba')
+    assert psy.has_numba
+
+    psy.SetUnitSystem(psy.IP)
+    expected_ip = psy.GetSatVapPres(68.)
+    psy.SetUnitSystem(psy.SI)
+    expected_si = psy.GetSatVapPres(20.)
+
+    # The compiled scalar functions only follow SetUnitSystem, so contexts must not silently use SI
+    with pytest.raises(RuntimeError):
+        with psy.UnitSystemContext(psy.IP):
+            pass
+    with pytest.raises(RuntimeError):
+        psy.UnitNamespace(psy, psy.IP).GetSatVapPres(68.)
+
+    # The namespaces of the scalar module are the array ones
+    assert psy.ip is psyv.ip and psy.si is psyv.si
+    assert psy.ip.GetSatVapPres(68.) == pytest.approx(expected_ip)
+
+    with psyv.UnitSystemContext(psy.IP):
+        assert psyv.GetSatVapPres(68.) == pytest.approx(expected_ip)
+        # What the compiled functions actually use
+        assert psy.GetUnitSystem() == psy.SI
+        assert psy.GetSatVapPres(20.) == pytest.approx(expected_si)
+    assert psyv.GetSatVapPres(20.) == pytest.approx(expected_si)
+
+
+def test_dataframe_accessor_from_relhum(units):
+    tdb, rh, pressure = _grid(units)
+    df = pd.DataFrame({'OAT': tdb, 'RH': rh})
+
+    result = df.psychro.from_relhum(tdb='OAT', rh='RH', pressure=pressure)
+
+    expected = psyv.CalcPsychrometricsFromRelHum(tdb, rh, pressure)
+    assert list(result.columns) == ['OAT', 'RH', *psyv.PsychrometricsAccessor.OUTPUTS]
+    for name, exp in zip(psyv.PsychrometricsAccessor.OUTPUTS, expected):
+        np.testing.assert_allclose(result[name], exp, rtol=1e-9)
+        assert result[name].dtype == np.float64
+
+    df['P'] = pressure
+    assert df.psychro.from_relhum('OAT', 'RH', 'P', prefix='oa_', inplace=True) is None
+    np.testing.assert_allclose(df['oa_TWetBulb'], result['TWetBulb'])
+
+
+def test_time_series_warm_start(monkeypatch):
+    psy.SetUnitSystem(psy.SI)
+    # Two weeks of 5-minute samples
+    day = np.arange(12 * 24 * 14) / (12 * 24)
+    tdb = 20 + 8 * np.sin(2 * np.pi * day)
+    rh = 0.6 - 0.2 * np.sin(2 * np.pi * day)
+    hum_ratio = psyv.GetHumRatioFromRelHum(tdb, rh, 101325.)
+    vap_pres = psyv.GetVapPresFromHumRatio(hum_ratio, 101325.)
+
+    # Too short to be worth warm-starting: solved cold
+    cold, n_cold = psyv.GetTWetBulbFromHumRatio(tdb, hum_ratio, 101325., method='illinois', return_iterations=True)
+    short = psyv.GetTWetBulbFromHumRatio(tdb, hum_ratio, 101325., method='illinois', return_iterations=True,
+                                         time_series=True)
+    np.testing.assert_array_equal(short[1], n_cold)
+
+    monkeypatch.setattr(psyv, 'WARM_START_MIN_SIZE', 0)
+    np.testing.assert_allclose(psyv.GetTDewPointFromVapPres(tdb, vap_pres, time_series=True),
+                               psyv.GetTDewPointFromVapPres(tdb, vap_pres), atol=psy.PSYCHROLIB_TOLERANCE)
+
+    warm, n_warm = psyv.GetTWetBulbFromHumRatio(tdb, hum_ratio, 101325., method='illinois', return_iterations=True,
+                                                time_series=True)
+    np.testing.assert_allclose(warm, cold, atol=psy.PSYCHROLIB_TOLERANCE)
+    assert n_warm.mean() < 0.7 * n_cold.mean()
+
+    # A wrong guess only widens the bracket back
+    guessed = psyv.GetTWetBulbFromHumRatio(tdb, hum_ratio, 101325., guess=tdb + 5)
+    np.testing.assert_allclose(guessed, psyv.GetTWetBulbFromHumRatio(tdb, hum_ratio, 101325.),
+                               atol=psy.PSYCHROLIB_TOLERANCE)
+
+
+def test_error_policies():
+    psy.SetUnitSystem(psy.SI)
+    tdb = pd.Series([20., 25., 300., 22.])
+    rh = pd.Series([0.5, 1.2, 0.5, 0.4])
+
+    with pytest.raises(ValueError):
+        psyv.CalcPsychrometricsFromRelHum(tdb, rh, 101325.)
+
+    values, valid = psyv.CalcPsychrometricsFromRelHum(tdb, rh, 101325., errors='nan', return_mask=True)
+    assert isinstance(valid, pd.Series)
+    np.testing.assert_array_equal(valid, [True, False, False, True])
+    assert np.isnan(values[1][~valid]).all()
+    assert values[1][0] == pytest.approx(psy.GetTWetBulbFromRelHum(20., 0.5, 101325.))
+
+    clipped = psyv.GetTDewPointFromRelHum(tdb, rh, errors='clip')
+    assert clipped[1] == pytest.approx(25.)
+    assert clipped[2] == pytest.approx(psy.GetTDewPointFromRelHum(200., 0.5))
+
+    with pytest.raises(ValueError):
+        psyv.GetSatVapPres(20., errors='ignore')
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_calc_in_chunks(workers):
+    psy.SetUnitSystem(psy.SI)
+    tdb, rh, pressure = _grid(psy.SI)
+    tdb = pd.Series(tdb)
+
+    expected = psyv.CalcPsychrometricsFromRelHum(tdb, rh, pressure)
+    result = psyv.CalcInChunks(psyv.CalcPsychrometricsFromRelHum, tdb, rh, pressure, chunk_size=10, workers=workers)
+
+    assert len(result) == len(expected)
+    for res, exp in zip(result, expected):
+        assert res.index.equals(tdb.index)
+        np.testing.assert_array_equal(res, exp)
+
+    out = np.empty(len(tdb))
+    assert psyv.CalcInChunks(psyv.GetSatVapPres, tdb.to_numpy(), chunk_size=7, workers=workers, out=out) is out
+    np.testing.assert_array_equal(out, psyv.GetSatVapPres(tdb.to_numpy()))
+
+
+def test_psychrometrics_cache():
+    psy.SetUnitSystem(psy.SI)
+    cache = psyv.PsychrometricsCache(resolution={'TDryBulb': 0.1, 'RelHum': 0.01}, maxsize=10)
+    tdb = pd.Series([20.01, 20.04, 25., np.nan, 25.])
+    rh = np.array([0.5, 0.5, 0.6, 0.5, 0.6])
+
+    result = cache.CalcPsychrometricsFromRelHum(tdb, rh, 101325.)
+
+    expected = psyv.CalcPsychrometricsFromRelHum(np.array([20., 20., 25., np.nan, 25.]), rh, 101325.)
+    for res, exp in zip(result, expected):
+        assert res.index.equals(tdb.index)
+        np.testing.assert_allclose(res, exp)
+    assert (cache.misses, cache.hits, len(cache)) == (2, 2, 2)
+
+    assert cache.CalcPsychrometricsFromRelHum(25., 0.6, 101325.)[0] == pytest.approx(expected[0][2])
+    assert (cache.misses, cache.hits) == (2, 3)
+
+    cache.CalcPsychrometricsFromRelHum(np.linspace(0, 30, 50), 0.5, 101325.)
+    assert len(cache) == 10
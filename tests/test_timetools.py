@@ -1,3 +1,6 @@
+import warnings
+
+import numpy as np
 import pytest
 
 from otters.wrangle.time_tools import *
@@ -10,4 +13,225 @@ def test_str2dt_cols_are_strings():
     
     df = str2dt(df)
     for col in df.columns:
-        assert type(col) == str
\ No newline at end of file
+        assert type(col) == str
+
+def test_multi_resample_matches_separate_resamples():
+    idx = pd.date_range('2024-01-01', periods=96, freq='5min')
+    df = pd.DataFrame({'Temp': range(96), 'ETAT_pump': [0, 1] * 48, 'Energy': 1., 'Flow': range(96, 0, -1)},
+                      index=idx, dtype=float)
+
+    result = multiResample(df, 'h', {'ETAT': 'max', 'Energy': 'sum', 'Flow': 'last'})
+
+    assert list(result.columns) == list(df.columns)
+    pd.testing.assert_series_equal(result['Temp'], df['Temp'].resample('h').mean())
+    pd.testing.assert_series_equal(result['ETAT_pump'], df['ETAT_pump'].resample('h').max())
+    pd.testing.assert_series_equal(result['Energy'], df['Energy'].resample('h').sum())
+    pd.testing.assert_series_equal(result['Flow'], df['Flow'].resample('h').last())
+
+    selective = selectiveResample(df, 'h', ['Temp'], 'Energy')
+    assert list(selective.columns) == ['Temp', 'Energy']
+    pd.testing.assert_frame_equal(selective, result[['Temp', 'Energy']])
+    assert list(selectiveResample(df, 'h', ['Temp'], ['Energy'], colOrder=['Energy', 'Temp']).columns) == \
+        ['Energy', 'Temp']
+
+    with pytest.raises(ValueError):
+        multiResample(df, 'h', {'Temp': 'median'})
+
+    # A key naming a column still matches the other columns as a pattern, exact names win
+    assert resolveAggregations(['ETAT', 'POMPE ETAT', 'T'], {'ETAT': 'max'}) == \
+        {'ETAT': 'max', 'POMPE ETAT': 'max', 'T': 'mean'}
+    assert resolveAggregations(['Flow (m3/h', 'Flow'], {'Flow': 'sum', 'Flow (m3/h': 'last'}) == \
+        {'Flow (m3/h': 'last', 'Flow': 'sum'}
+
+
+def test_prorate_intervals():
+    bills = pd.DataFrame({'De': pd.to_datetime(['2024-01-16', '2024-02-15', '2024-04-01']),
+                          'À': pd.to_datetime(['2024-02-14', '2024-03-15', '2024-04-30']),
+                          'kWh': [300., 300., 30.]})
+
+    result = resample_irregular_monthly_events(bills)
+
+    assert list(result.columns) == ['kWh', 'Days']
+    assert list(result.index) == list(pd.date_range('2024-01-01', '2024-04-01', freq='MS'))
+    # 16 of the first bill's 30 days fall in January, March only gets 15 of the second bill's 30 days
+    np.testing.assert_allclose(result['Days'], [16, 29, 15, 30])
+    np.testing.assert_allclose(result['kWh'], [160., 140. + 150., 150., 30.])
+    assert result['kWh'].sum() == pytest.approx(bills['kWh'].sum())
+
+    exclusive = resample_irregular_monthly_events(bills, event_dates_inclusive=False)
+    np.testing.assert_allclose(exclusive['Days'], [16, 28, 14, 29])
+    assert exclusive['kWh'].sum() == pytest.approx(bills['kWh'].sum())
+
+    mean = prorateIntervals(bills['De'], bills['À'], bills['kWh'], how='mean', day_col=None)
+    np.testing.assert_allclose(mean['kWh'], [300., 300., 300., 30.])
+
+    # A one-day exclusive bill has no days but keeps its value, in its start month
+    bills.loc[3] = [pd.Timestamp('2024-05-01'), pd.Timestamp('2024-05-01'), 5.]
+    with_empty = resample_irregular_monthly_events(bills, event_dates_inclusive=False)
+    np.testing.assert_allclose(with_empty['kWh'], list(exclusive['kWh']) + [5.])
+    np.testing.assert_allclose(with_empty['Days'], list(exclusive['Days']) + [0])
+
+    bills.loc[1, 'À'] = pd.NaT
+    with pytest.raises(ValueError, match=r'rows: \[1\]'):
+        prorateIntervals(bills['De'], bills['À'], bills['kWh'])
+
+
+def test_str2dt_infers_and_caches_format():
+    df = pd.DataFrame({'Date': ['13/01/2024 10:00', '14/01/2024 11:30', None], 'kWh': [1., 2., 3.]})
+
+    result = str2dt(df, source='test-dmy', dayfirst=True)
+
+    assert list(result.index[:2]) == [pd.Timestamp('2024-01-13 10:00'), pd.Timestamp('2024-01-14 11:30')]
+    assert pd.isna(result.index[2])
+    assert list(result.columns) == ['kWh']
+    assert list(df.columns) == ['Date', 'kWh']
+    assert inferTimeFormat(df['Date'], dayfirst=True) == {'format': '%d/%m/%Y %H:%M'}
+
+    epochs = pd.DataFrame({'timestamp': [1704067200, 1704070800]})
+    assert str2dt(epochs, inplace=True) is None
+    assert list(epochs.index) == [pd.Timestamp('2024-01-01 00:00'), pd.Timestamp('2024-01-01 01:00')]
+    assert epochs.index.name == 'Timestamp'
+
+    # A file of the same source in another format still parses
+    iso = str2dt(pd.DataFrame({'Date': ['2024-01-13T10:00:00']}), source='test-dmy')
+    assert iso.index[0] == pd.Timestamp('2024-01-13 10:00')
+
+
+def test_incremental_resampler_matches_batch():
+    idx = pd.date_range('2024-01-01 00:03', periods=1000, freq='7min')
+    df = pd.DataFrame({'Temp': np.sin(np.arange(1000)), 'ETAT_fan': np.arange(1000) % 3, 'kWh': 1.}, index=idx)
+    df = df.drop(df.index[300:400])
+    aggs = {'ETAT': 'max', 'kWh': 'sum'}
+
+    resampler = IncrementalResampler('h', aggs)
+    parts = []
+    for i in range(0, len(df), 37):
+        parts.append(resampler.update(df.iloc[i:i + 37]))
+        # Only the rows of the trailing hour are kept
+        assert len(resampler._tail) <= 9
+    parts.append(resampler.flush())
+    streamed = pd.concat(parts)
+
+    pd.testing.assert_frame_equal(streamed, multiResample(df, 'h', aggs), check_freq=False)
+    assert resampler.flush().empty
+
+    with pytest.raises(ValueError):
+        resampler.update(df.iloc[:5])
+
+    # Calendar frequencies, some labelled by the right edge of their bins
+    hourly = pd.DataFrame({'v': 1.}, index=pd.date_range('2024-01-01', periods=3000, freq='h'))
+    for freq in ('W', 'ME', 'D', 'MS'):
+        resampler = IncrementalResampler(freq, {'v': 'sum'})
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            parts = [resampler.update(hourly.iloc[i:i + 100]) for i in range(0, len(hourly), 100)]
+        streamed = pd.concat(parts + [resampler.flush()])
+        pd.testing.assert_frame_equal(streamed, multiResample(hourly, freq, {'v': 'sum'}), check_freq=False)
+
+
+def test_degree_days():
+    idx = pd.date_range('2024-01-01', '2024-03-31', freq='D')
+    weather = pd.DataFrame({'T2M': np.linspace(-10, 20, len(idx))}, index=idx)
+    weather.iloc[5, 0] = np.nan
+
+    monthly = degreeDays(weather, [15, 18])
+
+    assert list(monthly.columns) == ['HDD_15', 'HDD_18', 'CDD_15', 'CDD_18', 'Days']
+    for base in (15, 18):
+        expected = (base - weather['T2M']).clip(lower=0).resample('MS').sum()
+        np.testing.assert_allclose(monthly[f'HDD_{base}'], expected)
+        expected = (weather['T2M'] - base).clip(lower=0).resample('MS').sum()
+        np.testing.assert_allclose(monthly[f'CDD_{base}'], expected)
+    np.testing.assert_allclose(monthly['Days'], [30, 29, 31])
+
+    # Overlapping bills go through the cumulative sums, inclusive end dates
+    bills = pd.DataFrame({'De': pd.to_datetime(['2024-01-10', '2024-01-20', '2024-03-25']),
+                          'À': pd.to_datetime(['2024-02-09', '2024-02-01', '2024-04-24'])}, index=[10, 11, 12])
+    result = degreeDays(weather['T2M'], 18, periods=bills, kinds=('HDD',))
+    assert list(result.index) == [10, 11, 12]
+    for i, bill in bills.iterrows():
+        period = weather.loc[bill['De']:bill['À'], 'T2M']
+        assert result.loc[i, 'HDD_18'] == pytest.approx((18 - period).clip(lower=0).sum())
+        assert result.loc[i, 'Days'] == period.notna().sum()
+
+
+def test_time2timedelta_and_combine_date_time():
+    times = pd.Series([0, 930, 2359, np.nan], index=list('abcd'))
+
+    result = time2timedelta(times)
+
+    assert list(result.index) == list('abcd')
+    assert list(result[:3]) == [pd.Timedelta(0), pd.Timedelta('9h30min'), pd.Timedelta('23h59min')]
+    assert pd.isna(result['d'])
+    assert list(time2timedelta(pd.Series(['0930', '09:30'])).dt.total_seconds()) == [34200., 34200.]
+    assert time2timedelta(pd.Series(['235959']), '%H%M%S')[0] == pd.Timedelta('23:59:59')
+    for bad in (2400, 960, 930.5, '9h30'):
+        with pytest.raises(ValueError):
+            time2timedelta(pd.Series([bad]))
+
+    df = pd.DataFrame({'Date': ['13/01/2024', '13/01/2024', '14/01/2024'], 'Heure': [0, 1415, 30], 'kW': [1., 2., 3.]})
+    result = combineDateTime(df, 'Date', 'Heure', dayfirst=True)
+    assert list(result.index) == list(pd.to_datetime(['2024-01-13 00:00', '2024-01-13 14:15', '2024-01-14 00:30']))
+    assert list(result.columns) == ['kW']
+
+
+def test_overlay_years_aligns_wall_clock_and_weekdays():
+    idx = pd.date_range('2022-01-01', '2024-12-31', freq='h', tz='America/Montreal')
+    df = pd.DataFrame({'kWh': np.arange(len(idx), dtype=float)}, index=idx)
+    source = pd.Series(idx, index=idx)
+
+    result = overlayYears(df, n=2, start='2024-01-01')
+
+    assert list(result.columns) == [(0, 'kWh'), (1, 'kWh'), (2, 'kWh')]
+    assert result.index[0] == pd.Timestamp('2024-01-01', tz='America/Montreal')
+    # Summer time in 2024, the same wall clock time a year before
+    now = pd.Timestamp('2024-07-01 08:00', tz='America/Montreal')
+    assert idx[int(result.loc[now, (1, 'kWh')])] == pd.Timestamp('2023-07-01 08:00', tz='America/Montreal')
+    assert idx[int(result.loc[now, (2, 'kWh')])] == pd.Timestamp('2022-07-01 08:00', tz='America/Montreal')
+    weekday = overlayYears(source.dt.dayofweek.rename('day'), n=3, align='weekday', start='2024-01-01')
+    assert (weekday[(1, 'day')] == weekday[(0, 'day')]).all()
+    assert (weekday[(2, 'day')] == weekday[(0, 'day')]).all()
+    # Nothing before 2022 to look up
+    assert weekday[(3, 'day')].isna().all()
+
+
+@pytest.mark.parametrize('closed', ['both', 'left', 'right', 'neither'])
+def test_time_windows_match_masks(closed):
+    idx = pd.date_range('2024-01-01', periods=500, freq='6h')
+    df = pd.DataFrame({'kWh': np.arange(500.)}, index=idx)
+    windows = [('2024-01-08', '2024-01-15'), (None, '2024-01-03'), ('2024-04-01', None), ('2024-03-01', '2024-02-01')]
+
+    sorted_views = timeWindows(df, windows, closed)
+    shuffled_views = timeWindows(df.sample(frac=1, random_state=0), windows, closed)
+
+    for (start, end), view, shuffled in zip(windows, sorted_views, shuffled_views):
+        mask = np.ones(len(df), dtype=bool)
+        if start is not None:
+            mask &= (idx >= start) if closed in ('both', 'left') else (idx > start)
+        if end is not None:
+            mask &= (idx <= end) if closed in ('both', 'right') else (idx < end)
+        pd.testing.assert_frame_equal(view, df.loc[mask])
+        pd.testing.assert_frame_equal(shuffled.sort_index(), df.loc[mask], check_freq=False)
+
+    assert np.shares_memory(sorted_views[0]['kWh'].to_numpy(), df['kWh'].to_numpy())
+
+
+def test_str2dt_format_does_not_leak_between_files():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', UserWarning)
+        day_first = str2dt(pd.DataFrame({'Date': ['13/01/2024', '01/02/2024']}))
+        month_first = str2dt(pd.DataFrame({'Date': ['12/31/2024', '01/02/2024']}))
+
+    assert day_first.index[1] == pd.Timestamp('2024-02-01')
+    assert month_first.index[1] == pd.Timestamp('2024-01-02')
+
+    dates = combineDateTime(pd.DataFrame({'Date': ['12/31/2024', '01/02/2024'], 'Time': [0, 100]}), 'Date', 'Time')
+    assert dates.index[1] == pd.Timestamp('2024-01-02 01:00')
+
+    # A first file already parsed doesn't stop the next ones of the source from being inferred
+    str2dt(pd.DataFrame({'Date': pd.to_datetime(['2024-01-13 10:00'])}), source='test-parsed')
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        parsed = str2dt(pd.DataFrame({'Date': ['13/01/2024 10:00', '14/01/2024 10:00']}), source='test-parsed')
+    assert not caught
+    assert parsed.index[0] == pd.Timestamp('2024-01-13 10:00')
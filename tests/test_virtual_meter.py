@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from otters.model.VirtualMeter import VirtualMeter
+from otters.wrangle import psychrometrics as psy
+from otters.wrangle import psychrometrics_vec as psyv
+
+
+def _ahu_trends(periods=96):
+    index = pd.date_range('2024-07-01', periods=periods, freq='15min')
+    oat = np.linspace(20., 32., periods)
+    rat = np.full(periods, 24.)
+    return pd.DataFrame({
+        'AHU 1 - OAT': oat,
+        'AHU 1 - RAT': rat,
+        'AHU 1 - MAT': 0.3 * oat + 0.7 * rat,
+        'AHU 1 - SAT': np.full(periods, 13.),
+        'AHU 1 - OA RH': np.full(periods, 60.),
+        'AHU 1 - Airflow': np.full(periods, 5.),
+    }, index=index)
+
+
+def test_ahu_loads():
+    psy.SetUnitSystem(psy.SI)
+    df = _ahu_trends()
+    vm = VirtualMeter(df)
+    vm.createAHU(df, 'AHU 1')
+
+    loads = vm.AHUs['AHU 1'].computeLoads()
+
+    mixed = (df['AHU 1 - OAT'] - df['AHU 1 - RAT']).abs() >= 0.1
+    np.testing.assert_allclose(loads['OA fraction'][mixed], 0.3)
+    np.testing.assert_allclose(loads['OA fraction'][~mixed], 1.)
+    # The coil condenses when the mixed air dew point is above the supply temperature
+    w_ma = loads['HumRatio MA'].to_numpy()
+    w_sat = psyv.GetSatHumRatio(13., 101325.)
+    np.testing.assert_allclose(loads['HumRatio SA'], np.minimum(w_ma, w_sat))
+    assert (loads['Latent load'][w_ma > w_sat] > 0).all()
+    np.testing.assert_allclose(loads['Latent load'][w_ma <= w_sat], 0, atol=1e-6)
+    np.testing.assert_allclose(loads['Total load'], loads['Sensible load'] + loads['Latent load'])
+
+    # Outdoor air is better than return air only while its enthalpy is lower
+    better = loads['Enthalpy OA'] < loads['Enthalpy RA']
+    assert (loads['Economizer potential'][~better] == 0).all()
+    assert (loads['Economizer potential'][better] > 0).any()
+
+    audit = vm.auditAHUs()
+    assert audit.loc['AHU 1', 'Total cooling'] == pytest.approx(loads['Total load'].sum() * 0.25 / 1000)
+
+
+def test_ahu_loads_without_temperature_difference():
+    df = _ahu_trends(periods=4)
+    df[['AHU 1 - OAT', 'AHU 1 - RAT', 'AHU 1 - MAT']] = 24.
+    vm = VirtualMeter(df)
+    vm.createAHU(df, 'AHU 1')
+
+    loads = vm.AHUs['AHU 1'].computeLoads(units=psy.SI)
+
+    assert loads.notna().all().all()
+    np.testing.assert_allclose(loads['HumRatio MA'], loads['HumRatio OA'])
+
+
+def test_ahu_ignores_zone_humidity():
+    df = _ahu_trends().rename(columns={'AHU 1 - OA RH': 'AHU 1 - Zone RH'})
+    vm = VirtualMeter(df)
+    vm.createAHU(df, 'AHU 1')
+    with pytest.raises(ValueError, match='rh'):
+        vm.AHUs['AHU 1'].findColumns()
+
+    for name in ('AHU 1 - OA RH', 'AHU 1 - OARH', 'AHU 1 - Outdoor air humidity', 'Outside RH'):
+        vm.AHUs['AHU 1'].df = df.rename(columns={'AHU 1 - Zone RH': name})
+        assert vm.AHUs['AHU 1'].findColumns()['rh'].name == name
+
+
+def test_ahu_missing_column():
+    df = _ahu_trends().drop(columns='AHU 1 - Airflow')
+    vm = VirtualMeter(df)
+    vm.createAHU(df, 'AHU 1')
+    with pytest.raises(ValueError, match='airflow'):
+        vm.AHUs['AHU 1'].computeLoads(units=psy.SI)
+
+    vm.AHUs['AHU 1'].columns['airflow'] = pd.Series(5., index=df.index)
+    assert vm.AHUs['AHU 1'].computeLoads(units=psy.SI)['Total load'].notna().all()
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from otters.wrangle.wrangler import *
+
+
+def test_run_length_encode():
+    idx = pd.date_range('2024-01-01', periods=10, freq='min')
+    df = pd.DataFrame({'ETAT': [0, 0, 1, 1, 1, np.nan, np.nan, 1, 1, 0],
+                       'MODE': ['a', 'a', 'a', 'b', 'b', 'b', 'b', 'b', 'b', 'b']}, index=idx)
+    power = pd.Series(np.arange(10.), index=idx)
+
+    runs = runLengthEncode(df['ETAT'])
+    np.testing.assert_array_equal(runs.starts, [0, 2, 5, 7, 9])
+    np.testing.assert_array_equal(runs.lengths, [2, 3, 2, 2, 1])
+    assert runs.duration().iloc[1] == pd.Timedelta('3min')
+    assert runs.duration().iloc[-1] == pd.Timedelta('1min')
+    pd.testing.assert_series_equal(runs[1], df['ETAT'].iloc[2:5])
+
+    both = runLengthEncode(df)
+    np.testing.assert_array_equal(both.starts, [0, 2, 3, 5, 7, 9])
+
+    on = runs[runs.values == 1]
+    assert len(on) == 2
+    result = on.aggregate(power, ['sum', 'mean', 'max', 'count'])
+    np.testing.assert_allclose(result[(0, 'sum')], [2 + 3 + 4, 7 + 8])
+    np.testing.assert_allclose(result[(0, 'mean')], [3, 7.5])
+    np.testing.assert_allclose(result[(0, 'max')], [4, 8])
+    np.testing.assert_allclose(on[[1, 0]].aggregate(power, 'sum')[(0, 'sum')], [15, 9])
+
+    table = runs.to_frame()
+    assert list(table.columns) == ['ETAT', 'start', 'end', 'length', 'duration']
+    assert table.loc[2, 'end'] == idx[6]
+
+    islands = gapAndIsland(df[['ETAT']])
+    assert [len(island) for island in islands] == [2, 3, 2, 2, 1]
+    with pytest.raises(ValueError):
+        runs.aggregate(power.iloc[:5])
+
+
+def test_merge_intervals():
+    merged = mergeIntervals(([20, 0, 5, 2], [21, 10, 6, 3]), within=1)
+    assert merged[['start', 'end', 'count', 'first']].values.tolist() == [[0, 10, 3, 1], [20, 21, 1, 0]]
+
+    idx = pd.date_range('2024-01-01', periods=12, freq='h')
+    flag = pd.Series([1, 1, 0, 1, 0, 0, 0, 1, 1, 0, 0, 0], index=idx)
+    runs = runLengthEncode(flag)
+    merged = mergeIntervals(runs[runs.values == 1], within='2h')
+    with pytest.raises(ValueError, match='unit'):
+        mergeIntervals(runs[runs.values == 1], within=2)
+    assert list(merged['start']) == [idx[0], idx[7]]
+    assert list(merged['end']) == [idx[3], idx[8]]
+    assert list(merged['count']) == [2, 1]
+
+
+def test_merge_close_events_has_no_recursion_limit():
+    starts = pd.date_range('2024-01-01', periods=5000, freq='6h')
+    events = [[start, start + pd.Timedelta(hours=1)] for start in starts]
+
+    assert len(mergeCloseEvents(events, mergeWithinHours=4)) == 5000
+    # Events before the i-th are left alone
+    merged = mergeCloseEvents(events, mergeWithinHours=5, i=4999)
+    assert len(merged) == 4999 and merged[-1] == [starts[-2], starts[-1] + pd.Timedelta(hours=1)]
+
+    # Merged in place, like the recursive version
+    merged = mergeCloseEvents(events, mergeWithinHours=5)
+    assert merged is events
+    assert merged == [[starts[0], starts[-1] + pd.Timedelta(hours=1)]]
+
+
+def test_detect_events():
+    idx = pd.date_range('2024-01-01', periods=12, freq='min')
+    df = pd.DataFrame({
+        'PUMP_ETAT': [1, 1, 0, 1, 1, 1, 0, 0, 0, 1, np.nan, 1],
+        'FAN_ETAT': [0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1],
+        'OAT': np.linspace(-5, 5, 12),
+    }, index=idx)
+    kwh = pd.DataFrame({'PUMP_ETAT': 1., 'FAN_ETAT': 2.}, index=idx)
+
+    events = detectEvents(df, 'ETAT', energy=kwh)
+    assert list(events.columns) == ['entity', 'start', 'end', 'duration', 'energy']
+    assert list(events['entity']) == ['PUMP_ETAT'] * 4 + ['FAN_ETAT']
+    assert list(events['start']) == [idx[0], idx[3], idx[9], idx[11], idx[4]]
+    assert list(events['end']) == [idx[1], idx[5], idx[9], idx[11], idx[11]]
+    assert list(events['duration']) == [pd.Timedelta(minutes=m) for m in (2, 3, 1, 1, 8)]
+    assert list(events['energy']) == [2., 3., 1., 1., 16.]
+
+    merged = detectEvents(df, ['PUMP_ETAT'], merge_within='2min', min_duration='4min', energy=kwh['PUMP_ETAT'])
+    assert merged[['start', 'end']].values.tolist() == [[idx[0], idx[5]]]
+    assert merged['energy'][0] == 6.
+
+    cold = detectEvents(df, ['OAT'], condition=lambda data: data < 0)
+    assert cold[['start', 'end']].values.tolist() == [[idx[0], idx[5]]]
+    assert len(detectEvents(df, ['OAT'], condition=4)) == 1
+
+    empty = detectEvents(df.iloc[:0], 'ETAT', energy=kwh.iloc[:0])
+    assert empty.empty and list(empty.columns) == ['entity', 'start', 'end', 'duration', 'energy']
+
+    by = mergeIntervals(([0, 3, 1], [1, 4, 2]), by=['a', 'b', 'a'])
+    assert by[['group', 'start', 'end', 'count']].values.tolist() == [['a', 0, 2, 2], ['b', 3, 4, 1]]